@@ -5,3 +5,22 @@ from .error import *
 from .types import *
 from .defn import *
 from .version import *
+from .buffers import *
+
+
+"""Submodules imported on first attribute access, e.g. ilmsens_hal.utils (they pull in NumPy)"""
+_LAZY_SUBMODULES = {
+    "aio", "capture", "group", "memory", "monitor", "parallel", "scheduler", "server", "shared", "sim",
+    "streaming", "tracing", "utils",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_SUBMODULES:
+        import importlib
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _LAZY_SUBMODULES)
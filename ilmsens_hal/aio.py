@@ -0,0 +1,252 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from . import ilmsens_hal as hal
+from .buffers import BufferRing
+from .defn import meas_run
+from .error import ILMSENS_ERROR_AGAIN
+from .error import ILMSENS_ERROR_TIMEOUT
+from .types import ilmsens_hal_ModInfo
+
+
+
+class _LibraryLock:
+    """
+    Lets device calls run concurrently (shared) while library-wide calls run alone (exclusive).
+
+    A waiting exclusive call keeps new shared calls out, so initHAL/deinitHAL are not starved
+    by a stream issuing measGet after measGet.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting = 0
+
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._exclusive or self._waiting:
+                self._cond.wait()
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._shared -= 1
+                if not self._shared:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._waiting += 1
+            while self._exclusive or self._shared:
+                self._cond.wait()
+            self._waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
+
+
+
+_hal_lock = _LibraryLock()
+_executors_lock = threading.Lock()
+_library_executor: Optional[ThreadPoolExecutor] = None
+_device_executors: Dict[int, ThreadPoolExecutor] = {}
+
+
+
+def _new_executor(name: str) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ilmsens-aio-{name}")
+
+
+
+def _executor_for(dev_nums: Optional[List[int]]) -> ThreadPoolExecutor:
+    """
+    Single-thread executor serving the devices, must be called with _executors_lock held.
+
+    Devices used together share one executor, so their calls run in submission order and
+    a call waiting on one group never occupies a thread of another. When a call joins devices
+    served by different executors, a new executor takes over all of their devices; it first
+    waits until the calls already queued on the previous ones are done.
+    """
+    global _library_executor
+    if dev_nums is None:
+        if _library_executor is None:
+            _library_executor = _new_executor("hal")
+        return _library_executor
+
+    devices = sorted(set(dev_nums))
+    previous = {id(e): e for e in (_device_executors.get(dev_num) for dev_num in devices) if e is not None}
+    if len(previous) == 1 and all(dev_num in _device_executors for dev_num in devices):
+        return next(iter(previous.values()))
+
+    executor = _new_executor("-".join(map(str, devices)))
+    if previous:
+        drained = [e.submit(lambda: None) for e in previous.values()]
+        executor.submit(wait, drained)
+        for e in previous.values():
+            e.shutdown(wait=False)
+    for dev_num, e in list(_device_executors.items()):
+        if id(e) in previous:
+            _device_executors[dev_num] = executor
+    for dev_num in devices:
+        _device_executors[dev_num] = executor
+    return executor
+
+
+
+def _call(dev_nums: Optional[List[int]], func: Callable, args, kwargs):
+    with (_hal_lock.shared() if dev_nums is not None else _hal_lock.exclusive()):
+        return func(*args, **kwargs)
+
+
+
+def _submit(dev_nums: Optional[List[int]], func: Callable, *args, **kwargs) -> Future:
+    with _executors_lock:
+        return _executor_for(dev_nums).submit(_call, dev_nums, func, args, kwargs)
+
+
+
+async def run(dev_nums: Optional[List[int]], func: Callable, *args, **kwargs):
+    """
+    Runs a blocking HAL function on the executor of its devices.
+
+    Calls to the same devices run one after the other in the order they were made, calls to
+    other device groups run concurrently. Library-wide calls wait until no device call runs.
+
+    Parameters
+    ----------
+    dev_nums : List[int] or None
+        devices the call touches, None for library-wide calls (initHAL, deinitHAL, ...)
+    func : Callable
+        the blocking function
+    """
+    return await asyncio.wrap_future(_submit(dev_nums, func, *args, **kwargs))
+
+
+
+def _library_call(func: Callable) -> Callable:
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run(None, func, *args, **kwargs)
+    return wrapper
+
+
+
+def _device_call(func: Callable) -> Callable:
+    @functools.wraps(func)
+    async def wrapper(dev_nums, *args, **kwargs):
+        devices = [dev_nums] if isinstance(dev_nums, int) else dev_nums
+        return await run(devices, func, dev_nums, *args, **kwargs)
+    return wrapper
+
+
+
+getVersion = _library_call(hal.getVersion)
+setDEBLevel = _library_call(hal.setDEBLevel)
+initHAL = _library_call(hal.initHAL)
+deinitHAL = _library_call(hal.deinitHAL)
+
+openSensors = _device_call(hal.openSensors)
+closeSensors = _device_call(hal.closeSensors)
+getModId = _device_call(hal.getModId)
+getModInfo = _device_call(hal.getModInfo)
+setupSensors = _device_call(hal.setupSensors)
+setMaster = _device_call(hal.setMaster)
+setAvg = _device_call(hal.setAvg)
+setMLBS = _device_call(hal.setMLBS)
+setPD = _device_call(hal.setPD)
+xt_internal_setDel = _device_call(hal.xt_internal_setDel)
+synchMS = _device_call(hal.synchMS)
+measRun = _device_call(hal.measRun)
+measStop = _device_call(hal.measStop)
+measRdy = _device_call(hal.measRdy)
+measRead = _device_call(hal.measRead)
+measGet = _device_call(hal.measGet)
+readReg = _device_call(hal.readReg)
+writeReg = _device_call(hal.writeReg)
+readBlk = _device_call(hal.readBlk)
+writeBlk = _device_call(hal.writeBlk)
+
+
+
+async def stream(dev_nums: List[int], mod_info: Optional[ilmsens_hal_ModInfo] = None,
+                 buf_size_bytes: Optional[int] = None, timeout_millis: int = 100,
+                 num_buffers: int = 4, run_measurement: bool = True) -> AsyncIterator[object]:
+    """
+    Asynchronously iterates over measurements of a device group.
+
+    The devices are started in ILMSENS_HAL_RUN_BUF mode and measGet is awaited on the executor
+    of the group. The next measGet is already pending while the consumer processes the current
+    frame, so each yielded buffer is valid until num_buffers - 1 further frames have been requested.
+    The measurement is stopped when the iteration ends, also if the consuming task is cancelled.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+    mod_info : ilmsens_hal_ModInfo, optional
+        configuration of the devices, used to size the frame buffers
+    buf_size_bytes : int, optional
+        size of one frame buffer in bytes if mod_info is not given, defaults to getFrameSize
+    timeout_millis : int
+        measGet timeout, timeouts are retried
+    num_buffers : int
+        number of preallocated frame buffers (at least 2)
+    run_measurement : bool
+        start and stop the measurement run around the iteration
+
+    Yields
+    ------
+    bytearray
+        the raw data of one measurement of all devices
+    """
+    if num_buffers < 2:
+        raise ValueError("num_buffers must be at least 2")
+    if mod_info is not None:
+        buf_size_bytes = hal.deviceFrameSize(mod_info) * len(dev_nums)
+    elif buf_size_bytes is None:
+        buf_size_bytes = hal.getFrameSize(dev_nums) or hal.DEFAULT_BUF_SIZE_BYTES
+    ring = BufferRing(num_buffers, buf_size_bytes)
+
+    def request():
+        # submitted right away, so a measStop submitted later runs after it
+        future = _submit(dev_nums, hal.measGet, dev_nums, timeout_millis=timeout_millis, buffer=ring.next())
+        return asyncio.wrap_future(future)
+
+    if run_measurement:
+        res = await measRun(dev_nums, meas_run.ILMSENS_HAL_RUN_BUF)
+        if res < 0:
+            raise RuntimeError(f"measRun failed with error {res}")
+    pending = request()
+    try:
+        while True:
+            buffer, num_elements = await pending
+            pending = request()
+            if num_elements in (0, ILMSENS_ERROR_TIMEOUT.value, ILMSENS_ERROR_AGAIN.value):
+                continue
+            if num_elements < 0:
+                raise RuntimeError(f"measGet failed with error {num_elements}")
+            yield buffer
+    finally:
+        # queued behind the pending measGet, so it runs even if this task is cancelled meanwhile
+        stop = _submit(dev_nums, hal.measStop, dev_nums) if run_measurement else None
+        try:
+            await asyncio.shield(pending) # the buffer must not be released while the HAL still writes to it
+        except BaseException:
+            pass
+        finally:
+            if stop is not None:
+                await asyncio.shield(asyncio.wrap_future(stop))
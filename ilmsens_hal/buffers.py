@@ -0,0 +1,114 @@
+from ctypes import c_byte
+from typing import Callable, List, Optional
+
+
+class BufferRing:
+    """
+    A fixed ring of preallocated, writable acquisition buffers.
+
+    The buffers are handed out round-robin by next() and can be passed directly as
+    the buffer argument of measGet and measRead, so the HAL writes into them without
+    any allocation or copy. A buffer is reused after num_buffers further calls to
+    next(), i.e. a pipelined consumer may hold at most num_buffers - 1 buffers while
+    the producer is filling the next one.
+
+    Parameters
+    ----------
+    num_buffers : int
+        number of buffers in the ring
+    buf_size_bytes : int
+        size of each buffer in bytes
+    factory : Callable[[int], object], optional
+        creates one writable buffer of the given size in bytes, defaults to bytearray.
+        E.g. use lambda n: numpy.zeros(n // 4, dtype=numpy.int32) for NumPy buffers.
+    """
+
+    def __init__(self, num_buffers: int, buf_size_bytes: int, factory: Optional[Callable[[int], object]] = None):
+        if num_buffers < 1:
+            raise ValueError("num_buffers must be at least 1")
+        if buf_size_bytes < 1:
+            raise ValueError("buf_size_bytes must be at least 1")
+        if factory is None:
+            factory = bytearray
+
+        self.buf_size_bytes = buf_size_bytes
+        self._buffers: List[object] = [factory(buf_size_bytes) for _ in range(num_buffers)]
+        for buffer in self._buffers:
+            if memoryview(buffer).nbytes < buf_size_bytes:
+                raise ValueError("factory returned a buffer smaller than buf_size_bytes")
+        # ctypes views are created once per buffer, so handing them to the HAL costs nothing
+        self._c_buffers = [(c_byte * buf_size_bytes).from_buffer(buffer) for buffer in self._buffers]
+        self._index = -1
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def __getitem__(self, index: int):
+        return self._buffers[index]
+
+    def __iter__(self):
+        return iter(self._buffers)
+
+    @property
+    def index(self) -> int:
+        """Index of the buffer returned by the last call to next(), -1 before the first call."""
+        return self._index
+
+    def next(self):
+        """
+        Advances the ring and returns the next buffer.
+
+        Returns
+        -------
+        buffer
+            the next writable buffer in the ring
+        """
+        self._index = (self._index + 1) % len(self._buffers)
+        return self._buffers[self._index]
+
+    def c_buffer(self, index: int):
+        """
+        Returns the cached ctypes byte-array view of the buffer at index.
+        """
+        return self._c_buffers[index]
+
+
+"""Process ID of the process whose resource tracker was started by attachSharedMemory"""
+_attachTrackerPid = None
+
+
+def attachSharedMemory(name: str):
+    """
+    Attaches to a shared memory block owned by another process.
+
+    Before Python 3.13 attaching registers the block with the resource tracker, which would
+    unlink it when this process exits although the owner still uses it. The registration is
+    withdrawn again if the tracker was started for attaching. A tracker that was running
+    before is shared with the owner (the same process, or a multiprocessing parent) and
+    keeps it, withdrawing it there would drop the owner's registration.
+
+    Parameters
+    ----------
+    name : str
+        name of the shared memory block
+
+    Returns
+    -------
+    multiprocessing.shared_memory.SharedMemory
+        the attached block, to be closed but not unlinked by the caller
+    """
+    global _attachTrackerPid
+    import os
+    from multiprocessing import resource_tracker
+    from multiprocessing import shared_memory
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    if resource_tracker._resource_tracker._fd is None:
+        _attachTrackerPid = os.getpid()
+    shm = shared_memory.SharedMemory(name=name)
+    if _attachTrackerPid == os.getpid():
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
@@ -0,0 +1,335 @@
+import os
+import time
+import numpy as np
+from ctypes import Structure
+from ctypes import addressof
+from ctypes import c_char
+from ctypes import c_double
+from ctypes import c_uint
+from ctypes import c_uint64
+from ctypes import memmove
+from ctypes import sizeof
+from typing import List, Optional, Tuple
+from . import ilmsens_hal as hal
+from .error import ILMSENS_SUCCESS
+from .error import ILMSENS_ERROR_INVALID_PARAM
+from .error import ILMSENS_ERROR_STATE
+from .error import ILMSENS_ERROR_AGAIN
+from .error import ILMSENS_ERROR_TIMEOUT
+from .error import ILMSENS_ERROR_NOT_SUPPORTED
+from .types import ilmsens_hal_ModConfig
+from .types import ilmsens_hal_ModInfo
+from .types import ilmsens_hal_SampleType
+from .types import modInfoStruct
+from .types import unwrapRef
+from .types import unwrapValue
+from .utils import decode_frames
+from .utils import frame_dtype
+
+
+CAPTURE_MAGIC = b"ILMSCAP\0"
+CAPTURE_VERSION = 1
+"""Frames start at a multiple of this offset, so memory maps of the frame data are page aligned"""
+CAPTURE_ALIGNMENT = 4096
+
+
+class CaptureHeader(Structure):
+    _fields_ = [
+        ("mMagic", c_char * 8), # CAPTURE_MAGIC
+        ("mVersion", c_uint), # file format version
+        ("mHeaderSize", c_uint), # offset of the first frame [bytes]
+        ("mNumDevices", c_uint), # number of devices in each frame
+        ("mFrameSize", c_uint), # size of one frame of all devices [bytes]
+        ("mNumFrames", c_uint64), # number of frames, updated when the recorder is closed
+        ("mStartTime", c_double), # UNIX time of the recording start
+        ("mConfig", ilmsens_hal_ModConfig), # configuration requested with setupSensors
+    ]
+
+class CaptureDevice(Structure):
+    _fields_ = [
+        ("mDevNum", c_uint), # device-index during the recording
+        ("mModId", c_char * 1024), # unique device-identifier (getModId)
+        ("mInfo", ilmsens_hal_ModInfo), # device hardware-configuration (getModInfo)
+    ]
+
+
+
+def _frame_size(mod_infos: List[ilmsens_hal_ModInfo]) -> int:
+    return sum(hal.deviceFrameSize(info) for info in mod_infos)
+
+
+
+class CaptureWriter:
+    """
+    Records raw measurement frames into a capture file.
+
+    The file starts with a CaptureHeader and one CaptureDevice record per device, padded to
+    CAPTURE_ALIGNMENT, followed by fixed-size frames exactly as returned by measGet.
+    Frames are appended through a large write buffer so the acquisition loop only copies
+    into memory; call close() (or use a with block) to flush and store the frame count.
+
+    Parameters
+    ----------
+    path : str
+        capture file to create
+    dev_nums : List[int]
+        device-indexes of the recorded group
+    mod_infos : List[ilmsens_hal_ModInfo], optional
+        configuration of each device, the cached getModInfoSnapshot if omitted
+    mod_ids : List[bytes], optional
+        identifier of each device, queried with getModId if omitted
+    mod_config : ilmsens_hal_ModConfig, optional
+        configuration requested with setupSensors, stored for reference
+    buffer_bytes : int
+        size of the write buffer
+    """
+
+    def __init__(self, path: str, dev_nums: List[int], mod_infos: Optional[List[ilmsens_hal_ModInfo]] = None,
+                 mod_ids: Optional[List[bytes]] = None, mod_config: Optional[ilmsens_hal_ModConfig] = None,
+                 buffer_bytes: int = 8 << 20):
+        if mod_infos is None:
+            mod_infos = [hal.getModInfoSnapshot(dev_num) for dev_num in dev_nums]
+        if mod_ids is None:
+            mod_ids = [hal.getModId(dev_num) for dev_num in dev_nums]
+
+        self.path = path
+        self.header = CaptureHeader()
+        self.header.mMagic = CAPTURE_MAGIC
+        self.header.mVersion = CAPTURE_VERSION
+        self.header.mNumDevices = len(dev_nums)
+        self.header.mFrameSize = _frame_size(mod_infos)
+        self.header.mStartTime = time.time()
+        self.header.mConfig = mod_config if mod_config is not None else modInfoStruct(mod_infos[0]).mConfig
+
+        devices = (CaptureDevice * len(dev_nums))()
+        for device, dev_num, info, mod_id in zip(devices, dev_nums, mod_infos, mod_ids):
+            device.mDevNum = dev_num
+            device.mModId = mod_id
+            device.mInfo = modInfoStruct(info)
+        header_size = sizeof(self.header) + sizeof(devices)
+        self.header.mHeaderSize = -(-header_size // CAPTURE_ALIGNMENT) * CAPTURE_ALIGNMENT
+
+        self.frame_size = self.header.mFrameSize
+        self.frames_written = 0
+        self._file = open(path, "wb", buffering=buffer_bytes)
+        self._file.write(bytes(self.header))
+        self._file.write(bytes(devices))
+        self._file.write(bytes(self.header.mHeaderSize - header_size))
+
+    def write(self, buffer, num_frames: int = 1) -> None:
+        """
+        Appends num_frames complete frames from buffer (bytes-like, e.g. the result of measGet).
+        """
+        nbytes = num_frames * self.frame_size
+        data = memoryview(buffer).cast("B")
+        if data.nbytes < nbytes:
+            raise ValueError(f"buffer holds {data.nbytes} bytes, {num_frames} frame(s) need {nbytes}")
+        self._file.write(data[:nbytes])
+        self.frames_written += num_frames
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.header.mNumFrames = self.frames_written
+        self._file.seek(0)
+        self._file.write(bytes(self.header))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+class CaptureReader:
+    """
+    Memory-maps a capture file for lazy, random access to its frames.
+
+    Nothing but the header is read on opening; slicing frames, decoding and correlating
+    them only touches the pages that are actually used, so captures larger than RAM work.
+
+    Parameters
+    ----------
+    path : str
+        capture file written by CaptureWriter
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.header = CaptureHeader.from_buffer_copy(f.read(sizeof(CaptureHeader)))
+            if self.header.mMagic != CAPTURE_MAGIC.rstrip(b"\0"):
+                raise ValueError(f"{path} is not an ilmsens capture file")
+            if self.header.mVersion != CAPTURE_VERSION:
+                raise ValueError(f"unsupported capture version {self.header.mVersion}")
+            devices = (CaptureDevice * self.header.mNumDevices).from_buffer_copy(
+                f.read(sizeof(CaptureDevice) * self.header.mNumDevices))
+
+        self.dev_nums = [device.mDevNum for device in devices]
+        self.mod_ids = [device.mModId for device in devices]
+        self.mod_infos = [device.mInfo for device in devices]
+
+        info = self.mod_infos[0]
+        self.dtype = frame_dtype(info.mNumSamp, info.mConfig.mRx, len(self.dev_nums), info.mConfig.mOV)
+        if self.dtype.itemsize != self.header.mFrameSize:
+            raise ValueError("devices with different configurations are not supported")
+        # derive the count from the file size, so captures that were not closed cleanly stay readable
+        num_frames = (os.path.getsize(path) - self.header.mHeaderSize) // self.header.mFrameSize
+        self.frames = np.memmap(path, dtype=self.dtype, mode="r", offset=self.header.mHeaderSize,
+                                shape=(num_frames,)) if num_frames else np.zeros(0, dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def mod_info(self) -> ilmsens_hal_ModInfo:
+        return self.mod_infos[0]
+
+    def decode(self, start: int = 0, stop: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decodes frames [start, stop) without reading them into memory.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            int32 samples view of shape (frames, devices, rx, samples) and
+            sequence counters of shape (frames, devices)
+        """
+        return decode_frames(self.frames[start:stop], self.mod_info, num_devices=len(self.dev_nums))
+
+    def replay(self, loop: bool = False, frame_rate: Optional[float] = None) -> "CaptureReplay":
+        """
+        Returns a HAL backend replaying this capture, see CaptureReplay.
+        """
+        return CaptureReplay(self, loop=loop, frame_rate=frame_rate)
+
+
+
+class CaptureReplay:
+    """
+    HAL backend serving the frames of a capture file.
+
+    Install it with useBackend() to replay a recording through the regular measGet, measRead
+    and measRdy wrappers (and everything built on them). The recorded devices appear as
+    device-indexes 1..N with their recorded ModInfo and ModId; reconfiguration is not supported.
+
+    Parameters
+    ----------
+    reader : CaptureReader
+        the capture to replay
+    loop : bool
+        restart from the first frame at the end instead of timing out
+    frame_rate : float, optional
+        pace the replay to this many frames per second, as fast as possible if None
+    """
+
+    def __init__(self, reader: CaptureReader, loop: bool = False, frame_rate: Optional[float] = None):
+        self.reader = reader
+        self.loop = loop
+        self.frame_rate = frame_rate
+        self._position = 0
+        self._running = False
+        self._start = 0.0
+        self._devices = list(range(1, len(reader.dev_nums) + 1))
+
+    def _group_ok(self, dev_nums, num) -> bool:
+        return [int(dev_nums[i]) for i in range(unwrapValue(num))] == self._devices
+
+    def _available(self) -> int:
+        if not self._running:
+            return 0
+        end = self._position + 1 if self.loop and len(self.reader) else len(self.reader)
+        if self.frame_rate is not None:
+            end = min(end, int((time.monotonic() - self._start) * self.frame_rate))
+        return max(0, end - self._position)
+
+    def _read(self, dev_nums, num, buffer, size, timeout: Optional[float]) -> int:
+        if not self._group_ok(dev_nums, num):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        if not self._running:
+            return ILMSENS_ERROR_STATE.value
+        if unwrapValue(size) < self.reader.header.mFrameSize:
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._available() == 0:
+            now = time.monotonic()
+            if deadline is None:
+                return ILMSENS_ERROR_AGAIN.value
+            if now >= deadline or (self._position >= len(self.reader) and not self.loop):
+                return ILMSENS_ERROR_TIMEOUT.value # nothing more to come at the end of the capture
+            next_frame = self._start + (self._position + 1) / self.frame_rate if self.frame_rate else now
+            time.sleep(max(0.0, min(next_frame, deadline) - now))
+        index = self._position % len(self.reader)
+        frame = self.reader.frames[index:index+1]
+        memmove(unwrapRef(buffer), frame.ctypes.data, self.reader.header.mFrameSize)
+        self._position += 1
+        return self.reader.header.mFrameSize // sizeof(ilmsens_hal_SampleType)
+
+    def ilmsens_hal_getVersion(self, version) -> int:
+        version = unwrapRef(version)
+        version.mMajor, version.mMinor, version.mBuild = 1, 1, 1
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_setDEBLevel(self, level) -> int:
+        return unwrapValue(level)
+
+    def ilmsens_hal_initHAL(self) -> int:
+        return len(self._devices)
+
+    def ilmsens_hal_deinitHAL(self) -> None:
+        self._running = False
+
+    def ilmsens_hal_openSensors(self, dev_nums, num) -> int:
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_closeSensors(self, dev_nums, num) -> None:
+        self._running = False
+
+    def ilmsens_hal_getModId(self, dev_num, buffer, size) -> int:
+        index = unwrapValue(dev_num) - 1
+        if not 0 <= index < len(self._devices):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        mod_id = self.reader.mod_ids[index][:unwrapValue(size) - 1]
+        memmove(unwrapRef(buffer), mod_id + b"\0", len(mod_id) + 1)
+        return len(mod_id)
+
+    def ilmsens_hal_getModInfo(self, dev_num, info) -> int:
+        index = unwrapValue(dev_num) - 1
+        if not 0 <= index < len(self._devices):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        memmove(addressof(unwrapRef(info)), addressof(self.reader.mod_infos[index]), sizeof(ilmsens_hal_ModInfo))
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_measRun(self, dev_nums, num, mode) -> int:
+        if not self._group_ok(dev_nums, num):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        self._running = True
+        self._start = time.monotonic() - self._position / self.frame_rate if self.frame_rate else 0.0
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_measStop(self, dev_nums, num) -> int:
+        self._running = False
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_measRdy(self, dev_nums, num) -> int:
+        if not self._group_ok(dev_nums, num):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        return self._available() if self._running else ILMSENS_ERROR_STATE.value
+
+    def ilmsens_hal_measRead(self, dev_nums, num, buffer, size) -> int:
+        return self._read(dev_nums, num, buffer, size, None)
+
+    def ilmsens_hal_measGet(self, dev_nums, num, buffer, size, timeout_millis) -> int:
+        timeout_millis = unwrapValue(timeout_millis)
+        return self._read(dev_nums, num, buffer, size, timeout_millis / 1000.0 if timeout_millis else float("inf"))
+
+    def __getattr__(self, name: str):
+        if name.startswith("ilmsens_hal_"):
+            # configuration, register and memory access cannot be replayed
+            return lambda *args: ILMSENS_ERROR_NOT_SUPPORTED.value
+        raise AttributeError(name)
@@ -0,0 +1,210 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from . import ilmsens_hal as hal
+from .defn import config
+from .defn import meas_config
+from .defn import meas_run
+from .error import ILMSENS_ERROR_TIMEOUT
+from .monitor import SequenceTracker
+from .types import ilmsens_hal_ModConfig
+from .types import ModInfoSnapshot
+from .utils import decode_frames
+from .utils import frame_dtype
+
+
+_CONFIG_FIELDS = ("mOrder", "mSub", "mClk", "mOV", "mTx", "mRx")
+
+
+
+def _check(res, what: str) -> None:
+    if res is not None and res < 0:
+        raise RuntimeError(f"{what} failed with error {res}")
+
+
+
+class SensorGroup:
+    """
+    A hardware-synchronized master/slave group of sensors.
+
+    The group owns its opened devices and the cached ModInfo snapshot of each of them.
+    configure() only sends what changed since the last call: a new ilmsens_hal_ModConfig
+    triggers the full setup sequence (setupSensors, setMaster, synchMS off/on, setMLBS),
+    while new averages or wait cycles only call setAvg and a transmitter change only setPD.
+    A running measurement is paused around changes that require a stopped device.
+    The sequence counters of all frames read with get_frames() are tracked in sequence.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        device-indexes of the group
+    master : int, optional
+        device-index of the master sensor, defaults to the first device
+    """
+
+    def __init__(self, dev_nums: List[int], master: Optional[int] = None):
+        if not dev_nums:
+            raise ValueError("a group needs at least one device")
+        self.dev_nums = list(dev_nums)
+        self.master = self.dev_nums[0] if master is None else master
+        if self.master not in self.dev_nums:
+            raise ValueError(f"master {self.master} is not part of the group")
+        self.slaves = [dev_num for dev_num in self.dev_nums if dev_num != self.master]
+
+        self.mod_info: Dict[int, ModInfoSnapshot] = {}
+        self._config: Optional[Tuple] = None
+        self._avg: Optional[Tuple[int, int]] = None
+        self._tx_on: Optional[bool] = None
+        self._run_mode = None
+        self._opened = False
+        self._frames: Dict[int, np.ndarray] = {}
+        self.sequence = SequenceTracker(len(self.dev_nums))
+
+    # ------------------------------------------------------------------ session
+
+    def open(self) -> "SensorGroup":
+        if not self._opened:
+            _check(hal.openSensors(self.dev_nums), "openSensors")
+            self._opened = True
+        return self
+
+    def close(self) -> None:
+        if self._opened:
+            self.stop()
+            hal.closeSensors(self.dev_nums)
+            self._opened = False
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------ configuration
+
+    def configure(self, mod_config: Optional[ilmsens_hal_ModConfig] = None, avg: Optional[int] = None,
+                  wait_cyc: Optional[int] = None, tx_on: Optional[bool] = None) -> None:
+        """
+        Applies the configuration deltas to all devices of the group.
+
+        Parameters
+        ----------
+        mod_config : ilmsens_hal_ModConfig, optional
+            basic sensor configuration, only applied if it differs from the last one
+        avg : int, optional
+            software averages
+        wait_cyc : int, optional
+            wait cycles (0 = continuous mode)
+        tx_on : bool, optional
+            transmitter power state
+        """
+        new_config = None
+        if mod_config is not None:
+            new_config = tuple(getattr(mod_config, field) for field in _CONFIG_FIELDS)
+            if new_config == self._config:
+                new_config = None
+
+        new_avg = None
+        if avg is not None or wait_cyc is not None:
+            current = self._avg or (None, 0)
+            new_avg = (avg if avg is not None else current[0], wait_cyc if wait_cyc is not None else current[1])
+            if new_avg[0] is None:
+                raise ValueError("avg must be given the first time averages are configured")
+            if new_avg == self._avg and new_config is None:
+                new_avg = None
+        elif new_config is not None and self._avg is not None:
+            new_avg = self._avg # setupSensors resets the averages
+
+        new_tx = None if tx_on is None or tx_on == self._tx_on else tx_on
+        if new_config is None and new_avg is None and new_tx is None:
+            return
+
+        run_mode = self._run_mode
+        self.stop()
+        if new_config is not None:
+            _check(hal.setupSensors(self.dev_nums, mod_config), "setupSensors")
+            _check(hal.setMaster([self.master], config.ILMSENS_HAL_MASTER_SENSOR), "setMaster")
+            if self.slaves:
+                _check(hal.setMaster(self.slaves, config.ILMSENS_HAL_SLAVE_SENSOR), "setMaster")
+            _check(hal.synchMS(self.dev_nums, meas_config.ILMSENS_HAL_SYNCH_OFF), "synchMS")
+            _check(hal.synchMS(self.dev_nums, meas_config.ILMSENS_HAL_SYNCH_ON), "synchMS")
+            _check(hal.setMLBS(self.dev_nums), "setMLBS")
+            self._config = new_config
+        if new_avg is not None:
+            _check(hal.setAvg(self.dev_nums, new_avg[0], new_avg[1]), "setAvg")
+            self._avg = new_avg
+        if new_tx is not None:
+            mode = meas_config.ILMSENS_HAL_TX_ON if new_tx else meas_config.ILMSENS_HAL_TX_OFF
+            _check(hal.setPD(self.dev_nums, mode), "setPD")
+            self._tx_on = new_tx
+        if new_config is not None or new_avg is not None:
+            self.refresh()
+        if run_mode is not None:
+            self.start(run_mode)
+
+    def refresh(self) -> None:
+        """
+        Takes the ModInfo snapshots of all devices, re-read by the HAL wrapper after a configuration change.
+        """
+        self.mod_info = {dev_num: hal.getModInfoSnapshot(dev_num) for dev_num in self.dev_nums}
+        self._frames.clear()
+
+    # ------------------------------------------------------------------ measurement
+
+    def start(self, mode=meas_run.ILMSENS_HAL_RUN_BUF) -> None:
+        if self._run_mode is None:
+            _check(hal.measRun(self.dev_nums, mode), "measRun")
+            self._run_mode = mode
+            self.sequence.reset()
+
+    def stop(self) -> None:
+        if self._run_mode is not None:
+            hal.measStop(self.dev_nums)
+            self._run_mode = None
+
+    @property
+    def running(self) -> bool:
+        return self._run_mode is not None
+
+    def dtype(self) -> np.dtype:
+        """
+        Structured dtype of one frame of the whole group.
+        """
+        if not self.mod_info:
+            self.refresh()
+        info = self.mod_info[self.master]
+        return frame_dtype(info.mNumSamp, info.mConfig.mRx, len(self.dev_nums), info.mConfig.mOV)
+
+    def get_frames(self, n: int = 1, timeout_millis: int = 500) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reads n aligned frames of all devices, starting the measurement if necessary.
+
+        The frames are written into a buffer owned by the group, so the returned views
+        stay valid until the next call with the same n. Raises TimeoutError if fewer than
+        n frames arrived within timeout_millis; the sequence counters of those that did
+        are still tracked.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            int32 samples of shape (n, devices, rx, samples) and
+            sequence counters of shape (n, devices)
+        """
+        self.start()
+        dtype = self.dtype()
+        frames = self._frames.get(n)
+        if frames is None:
+            frames = np.zeros(n, dtype=dtype)
+            self._frames[n] = frames
+
+        _, num_elements = hal.measGet(self.dev_nums, timeout_millis=timeout_millis, buffer=frames, num_frames=n)
+        if num_elements in (0, ILMSENS_ERROR_TIMEOUT.value):
+            raise TimeoutError(f"no complete frame within {timeout_millis} ms")
+        _check(num_elements, "measGet")
+        complete = num_elements * 4 // frames.dtype.itemsize
+
+        info = self.mod_info[self.master]
+        samples, seq_counter = decode_frames(frames[:complete], info, num_devices=len(self.dev_nums))
+        self.sequence.update(seq_counter) # also for a partial read, so the frames read are not counted as lost
+        if complete < n:
+            raise TimeoutError(f"only {complete} of {n} frames within {timeout_millis} ms")
+        return samples, seq_counter
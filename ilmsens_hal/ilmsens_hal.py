@@ -1,18 +1,296 @@
+import os
 from ctypes import cdll
 from ctypes import byref
+from ctypes import c_int
 from ctypes import c_uint
+from ctypes import c_char_p
+from ctypes import c_void_p
+from ctypes import POINTER
 from ctypes import sizeof
 from ctypes import c_byte
 from ctypes import c_size_t
+from ctypes import Array
 from ctypes import create_string_buffer, string_at
-from typing import List, Tuple
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional, Union
 from .types import *
 from .defn import *
 
 
-"""Load cpp library"""
+"""Name of the cpp library"""
 lib_name = "libilmsens_hal.so"
-c_ilmsens_hal = cdll.LoadLibrary(lib_name)
+
+"""C prototypes (restype, argtypes) of the HAL entry points"""
+_DevNums = POINTER(c_uint)
+PROTOTYPES = {
+    "ilmsens_hal_getVersion": (c_int, [POINTER(ilmsens_hal_Version)]),
+    "ilmsens_hal_setDEBLevel": (c_int, [c_uint]),
+    "ilmsens_hal_initHAL": (c_int, []),
+    "ilmsens_hal_deinitHAL": (None, []),
+    "ilmsens_hal_openSensors": (c_int, [_DevNums, c_uint]),
+    "ilmsens_hal_closeSensors": (None, [_DevNums, c_uint]),
+    "ilmsens_hal_getModId": (c_int, [c_uint, c_char_p, c_size_t]),
+    "ilmsens_hal_getModInfo": (c_int, [c_uint, POINTER(ilmsens_hal_ModInfo)]),
+    "ilmsens_hal_setupSensors": (c_int, [_DevNums, c_uint, POINTER(ilmsens_hal_ModConfig)]),
+    "ilmsens_hal_setMaster": (c_int, [_DevNums, c_uint, c_int]),
+    "ilmsens_hal_setAvg": (c_int, [_DevNums, c_uint, c_uint, c_uint]),
+    "ilmsens_hal_setMLBS": (c_int, [_DevNums, c_uint]),
+    "ilmsens_hal_setPD": (c_int, [_DevNums, c_uint, c_int]),
+    "ilmsens_hal_synchMS": (c_int, [_DevNums, c_uint, c_int]),
+    "ilmsens_hal_xt_internal_setDel": (c_int, [_DevNums, c_uint, c_int]),
+    "ilmsens_hal_measRun": (c_int, [_DevNums, c_uint, c_int]),
+    "ilmsens_hal_measStop": (c_int, [_DevNums, c_uint]),
+    "ilmsens_hal_measRdy": (c_int, [_DevNums, c_uint]),
+    "ilmsens_hal_measRead": (c_int, [_DevNums, c_uint, c_void_p, c_size_t]),
+    "ilmsens_hal_measGet": (c_int, [_DevNums, c_uint, c_void_p, c_size_t, c_uint]),
+    "ilmsens_hal_readReg": (c_int, [_DevNums, c_uint, c_uint, c_void_p, c_size_t]),
+    "ilmsens_hal_writeReg": (c_int, [_DevNums, c_uint, c_uint, ilmsens_hal_MemoryType]),
+    "ilmsens_hal_readBlk": (c_int, [_DevNums, c_uint, c_uint, c_uint, c_void_p, c_size_t]),
+    "ilmsens_hal_writeBlk": (c_int, [_DevNums, c_uint, c_uint, c_uint, c_void_p, c_size_t]),
+}
+
+"""
+Hot polling paths that are bound without argtypes: per-argument conversion through argtypes
+costs more than the C call itself, so their wrappers pass arguments already in C types
+(device arrays, ctypes buffers, c_size_t) and plain ints only for (unsigned) int parameters.
+"""
+UNCHECKED_CALLS = {
+    "ilmsens_hal_measRdy",
+    "ilmsens_hal_measRead",
+    "ilmsens_hal_measGet",
+}
+
+
+
+def _bind_prototypes(lib) -> None:
+    """
+    Declares restype and argtypes of all HAL entry points found in lib once,
+    so ctypes converts native Python arguments to the correct C types.
+    """
+    for name, (restype, argtypes) in PROTOTYPES.items():
+        func = getattr(lib, name, None)
+        if func is None:
+            continue # e.g. internal entry points missing in older HAL versions
+        func.restype = restype
+        if name not in UNCHECKED_CALLS:
+            func.argtypes = argtypes
+
+
+
+def useBackend(backend) -> object:
+    """
+    Routes all wrappers to another HAL implementation.
+
+    Parameters
+    ----------
+    backend : object
+        a loaded library (see loadLibrary) or any object providing the ilmsens_hal_*
+        entry points, e.g. ilmsens_hal.sim.SimulatedHAL
+
+    Returns
+    -------
+    object
+        the previously used backend
+    """
+    return _set_backend(backend)
+
+
+
+def _set_backend(backend, invalidate: bool = True) -> object:
+    """
+    Installs backend; invalidate=False keeps the cached device metadata, for wrappers
+    of the current backend (e.g. the tracing proxy) that talk to the same devices.
+    """
+    global c_ilmsens_hal
+    previous = c_ilmsens_hal
+    c_ilmsens_hal = backend
+    if invalidate:
+        invalidateModInfo()
+    return previous
+
+
+
+def getBackend() -> object:
+    """
+    Returns the HAL implementation currently used by the wrappers, loading the default one if necessary.
+    """
+    global c_ilmsens_hal
+    if isinstance(c_ilmsens_hal, _LazyBackend):
+        return c_ilmsens_hal.resolve()
+    return c_ilmsens_hal
+
+
+
+def loadLibrary(path: Optional[str] = None) -> object:
+    """
+    Loads the HAL shared library, binds its prototypes and makes it the backend.
+
+    Parameters
+    ----------
+    path : str, optional
+        library to load, defaults to ILMSENS_HAL_LIBRARY or lib_name
+    """
+    if path is None:
+        path = os.environ.get("ILMSENS_HAL_LIBRARY", lib_name)
+    lib = cdll.LoadLibrary(path)
+    _bind_prototypes(lib)
+    useBackend(lib)
+    return lib
+
+
+
+class _LazyBackend:
+    """
+    Placeholder backend resolving the default one on the first HAL call.
+
+    Importing the package therefore neither needs the shared library nor pays for
+    loading it. The default is the simulator if ILMSENS_HAL_BACKEND=sim, otherwise
+    the library from ILMSENS_HAL_LIBRARY or lib_name.
+    """
+
+    def resolve(self) -> object:
+        global c_ilmsens_hal
+        if c_ilmsens_hal is self:
+            if os.environ.get("ILMSENS_HAL_BACKEND", "").lower() == "sim":
+                from .sim import SimulatedHAL
+                useBackend(SimulatedHAL(num_devices=int(os.environ.get("ILMSENS_HAL_SIM_DEVICES", "1"))))
+            else:
+                loadLibrary()
+        return c_ilmsens_hal
+
+    def __getattr__(self, name: str):
+        if not name.startswith("ilmsens_hal_"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+
+
+"""Cached device metadata, see getModInfoSnapshot, getModId and getFrameSize"""
+_mod_info_cache: Dict[int, ModInfoSnapshot] = {}
+_mod_id_cache: Dict[int, bytes] = {}
+_frame_size_cache: Dict[Tuple[int, ...], int] = {}
+
+"""Backend of the wrappers, the cpp library or the simulator is loaded on the first call"""
+c_ilmsens_hal = _LazyBackend()
+
+@lru_cache(maxsize=64)
+def _device_array(dev_nums: Tuple[int, ...]) -> Array:
+    return (c_uint * len(dev_nums))(*dev_nums)
+
+
+
+def deviceArray(dev_nums: List[int]) -> Array:
+    """
+    Returns the cached C array (unsigned int[]) of a device group.
+
+    The HAL reads pNum device-indexes from pDevNums, so a group must be passed as a real
+    array, not a pointer to its first element. Arrays are built once per group and reused
+    by all wrappers; a ctypes array passed in is used as is.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+
+    Returns
+    -------
+    Array
+        a c_uint array holding the device-indexes
+    """
+    if isinstance(dev_nums, Array):
+        return dev_nums
+    return _device_array(tuple(dev_nums))
+
+
+
+"""Buffer size for measRead and measGet if neither size nor buffer is given and the frame size is unknown"""
+DEFAULT_BUF_SIZE_BYTES = 4096
+
+
+
+def _c_buffer(buffer, buf_size_bytes: Optional[int]) -> Tuple[Array, int]:
+    """
+    Wraps a writable buffer in a ctypes byte array without copying it.
+
+    Parameters
+    ----------
+    buffer : writable buffer or None
+        a bytearray, memoryview, NumPy array or ctypes array, or None to allocate a new zeroed buffer
+    buf_size_bytes : int or None
+        number of bytes the HAL may write, defaults to the size of the buffer
+
+    Returns
+    -------
+    Tuple[Array, int]
+        the ctypes view on the buffer and the number of usable bytes
+    """
+    if buffer is None:
+        if buf_size_bytes is None:
+            buf_size_bytes = DEFAULT_BUF_SIZE_BYTES
+        return (c_byte * buf_size_bytes)(), buf_size_bytes
+
+    if isinstance(buffer, Array):
+        view = buffer
+        nbytes = sizeof(buffer)
+    else:
+        mem = memoryview(buffer)
+        if mem.readonly:
+            raise ValueError("buffer must be writable")
+        if not mem.c_contiguous:
+            raise ValueError("buffer must be C-contiguous")
+        nbytes = mem.nbytes
+        view = (c_byte * nbytes).from_buffer(mem)
+
+    if buf_size_bytes is None:
+        buf_size_bytes = nbytes
+    elif buf_size_bytes > nbytes:
+        raise ValueError(f"buf_size_bytes ({buf_size_bytes}) exceeds buffer size ({nbytes})")
+    return view, buf_size_bytes
+
+
+
+def _frame_buffer(dev_nums: List[int], buffer, buf_size_bytes: Optional[int], num_frames: int) -> Tuple[Array, int, int]:
+    """
+    Prepares the measRead/measGet buffer for num_frames measurements of a device group.
+
+    Without buffer and buf_size_bytes the buffer is sized exactly from getFrameSize, an
+    undersized buffer is rejected before the HAL is called.
+
+    Returns
+    -------
+    Tuple[Array, int, int]
+        the ctypes view on the buffer, the number of usable bytes and the frame size
+        of the group (0 if it is unknown)
+    """
+    if num_frames < 1:
+        raise ValueError("num_frames must be at least 1")
+    frame_size = getFrameSize(dev_nums)
+    if buffer is None and buf_size_bytes is None and frame_size:
+        buf_size_bytes = num_frames * frame_size
+    c_buffer, buf_size_bytes = _c_buffer(buffer, buf_size_bytes)
+    if buf_size_bytes < num_frames * frame_size:
+        raise ValueError(f"buffer of {buf_size_bytes} bytes is too small for {num_frames} frame(s) "
+                         f"of {frame_size} bytes")
+    if num_frames > 1 and not frame_size:
+        raise ValueError("frame size of the devices is unknown, cannot read several frames")
+    return c_buffer, buf_size_bytes, frame_size
+
+
+
+def _read_frames(func, dev_nums: List[int], c_buffer: Array, frame_size: int, num_frames: int, *args) -> int:
+    """
+    Reads num_frames consecutive measurements into c_buffer with one HAL call per frame.
+    Stops at the first call returning no data; its error-code is returned if no frame was read.
+    """
+    devices = deviceArray(dev_nums)
+    total = 0
+    for i in range(num_frames):
+        frame = (c_byte * frame_size).from_buffer(c_buffer, i * frame_size)
+        res = func(devices, len(dev_nums), frame, c_size_t(frame_size), *args)
+        if res <= 0:
+            return total if total else res
+        total += res
+    return total
 
 
 
@@ -76,6 +354,7 @@ def initHAL() -> int:
     """
     global c_ilmsens_hal
     num_devices = c_ilmsens_hal.ilmsens_hal_initHAL()
+    invalidateModInfo()
     return num_devices
 
 
@@ -89,6 +368,7 @@ def deinitHAL() -> None:
     """
     global c_ilmsens_hal
     c_ilmsens_hal.ilmsens_hal_deinitHAL()
+    invalidateModInfo()
 
 
 
@@ -98,9 +378,9 @@ def openSensors(dev_nums: List[int]) -> int:
     This function must be called before doing the configuration or starting a measurement session.
     """
     global c_ilmsens_hal
-    c_ilmsens_hal.ilmsens_hal_openSensors(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums))
+    return c_ilmsens_hal.ilmsens_hal_openSensors(
+        deviceArray(dev_nums),
+        len(dev_nums)
     )
 
 
@@ -112,25 +392,32 @@ def closeSensors(dev_nums: List[int]) -> None:
     """
     global c_ilmsens_hal
     c_ilmsens_hal.ilmsens_hal_closeSensors(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums))
+        deviceArray(dev_nums),
+        len(dev_nums)
     )
 
 
 
-def getModId(dev_num: int) -> str:
+def getModId(dev_num: int) -> bytes:
     """
     Gets unique device-identifier.
+    The identifier is cached per device-index until the library is (de)initialized.
     """
     global c_ilmsens_hal
+    mod_id = _mod_id_cache.get(dev_num)
+    if mod_id is not None:
+        return mod_id
     buffer_size = modinfo.ILMSENS_HAL_MOD_ID_BUF_SIZE.value
     buffer = create_string_buffer(buffer_size)
-    _ = c_ilmsens_hal.ilmsens_hal_getModId(
-        c_uint(dev_num),
-        byref(buffer),
-        c_size_t(buffer_size)
+    res = c_ilmsens_hal.ilmsens_hal_getModId(
+        dev_num,
+        buffer,
+        buffer_size
     )
-    return string_at(buffer)
+    mod_id = string_at(buffer)
+    if res is None or res >= 0:
+        _mod_id_cache[dev_num] = mod_id
+    return mod_id
 
 
 
@@ -141,24 +428,124 @@ def getModInfo(dev_num: int) -> int:
     global c_ilmsens_hal
     mod_info = ilmsens_hal_ModInfo()
     c_ilmsens_hal.ilmsens_hal_getModInfo(
-        c_uint(dev_num),
+        dev_num,
         byref(mod_info)
     )
     return mod_info
 
 
 
+def getModInfoSnapshot(dev_num: int) -> ModInfoSnapshot:
+    """
+    Gets the cached, immutable device hardware-configuration.
+
+    The snapshot is taken with getModInfo on first use and kept until a call that changes
+    the configuration (setupSensors, setMaster, setAvg, synchMS) or (de)initializes the
+    library invalidates it, so per-frame processing can read mNumSamp or the value scale
+    without calling into the library.
+
+    Raises
+    ------
+    RuntimeError
+        if getModInfo fails, nothing is cached then
+    """
+    global c_ilmsens_hal
+    snapshot = _mod_info_cache.get(dev_num)
+    if snapshot is None:
+        mod_info = ilmsens_hal_ModInfo()
+        res = c_ilmsens_hal.ilmsens_hal_getModInfo(
+            dev_num,
+            byref(mod_info)
+        )
+        if res is not None and res < 0:
+            raise RuntimeError(f"getModInfo failed with error {res}")
+        snapshot = ModInfoSnapshot(mod_info)
+        _mod_info_cache[dev_num] = snapshot
+    return snapshot
+
+
+
+def deviceFrameSize(mod_info: ilmsens_hal_ModInfo) -> int:
+    """
+    Size in bytes of one measurement of a device as returned by measGet and measRead.
+
+    Each of the mRx channels holds mNumSamp samples followed by mOV status words,
+    the last status word of Rx 1 (offset 2^order x OV - 1) being the sequence counter
+    (programming guide, eq. 3.8).
+
+    Parameters
+    ----------
+    mod_info : ilmsens_hal_ModInfo
+        configuration of the device (or a ModInfoSnapshot)
+    """
+    config = mod_info.mConfig
+    return config.mRx * (mod_info.mNumSamp + config.mOV) * sizeof(ilmsens_hal_SampleType)
+
+
+
+def getFrameSize(dev_nums: List[int], num_frames: int = 1) -> int:
+    """
+    Gets the size in bytes of num_frames measurements of a device group.
+
+    The group size is the sum of deviceFrameSize over the cached ModInfo snapshots of its
+    devices and is kept until the configuration of one of them changes.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+    num_frames : int
+        number of measurements
+
+    Returns
+    -------
+    int
+        buffer size for measGet/measRead in bytes, 0 if the devices report no configuration
+        or getModInfo fails
+    """
+    key = tuple(dev_nums)
+    frame_size = _frame_size_cache.get(key)
+    if frame_size is None:
+        try:
+            frame_size = sum(deviceFrameSize(getModInfoSnapshot(dev_num)) for dev_num in key)
+        except RuntimeError:
+            return 0 # the read itself then reports the error of the HAL
+        if frame_size:
+            _frame_size_cache[key] = frame_size
+    return frame_size * num_frames
+
+
+
+def invalidateModInfo(dev_nums: Optional[List[int]] = None) -> None:
+    """
+    Drops the cached ModInfo snapshots of the given devices, or of all devices and their identifiers.
+
+    The configuring wrappers call it after the HAL call returned, so a snapshot taken
+    concurrently while the call ran cannot outlive it.
+    """
+    _frame_size_cache.clear()
+    if dev_nums is None:
+        _mod_info_cache.clear()
+        _mod_id_cache.clear()
+        return
+    for dev_num in dev_nums:
+        _mod_info_cache.pop(dev_num, None)
+
+
+
 def setupSensors(dev_nums: List[int], config: ilmsens_hal_ModConfig) -> int:
     """
     Performs the initial setup of specified devices.
     This function must be called before starting a measurement session.
     """
     global c_ilmsens_hal
-    c_ilmsens_hal.ilmsens_hal_setupSensors(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
+    res = c_ilmsens_hal.ilmsens_hal_setupSensors(
+        deviceArray(dev_nums),
+        len(dev_nums),
         byref(config)
     )
+    invalidateModInfo(dev_nums)
+    return res
 
 
 
@@ -171,10 +558,11 @@ def setMaster(dev_nums: List[int], mode: c_int) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_setMaster(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
+        deviceArray(dev_nums),
+        len(dev_nums),
         mode
     )
+    invalidateModInfo(dev_nums)
     return res
 
 
@@ -190,11 +578,12 @@ def setAvg(dev_nums: List[int], avg: int, wait_cyc: int) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_setAvg(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
-        c_uint(avg),
-        c_uint(wait_cyc)
+        deviceArray(dev_nums),
+        len(dev_nums),
+        avg,
+        wait_cyc
     )
+    invalidateModInfo(dev_nums)
     return res
 
 
@@ -210,8 +599,8 @@ def setMLBS(dev_nums: List[int]) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_setMLBS(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums))
+        deviceArray(dev_nums),
+        len(dev_nums)
     )
     return res
 
@@ -225,8 +614,8 @@ def setPD(dev_nums: List[int], mode: c_int) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_setPD(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
+        deviceArray(dev_nums),
+        len(dev_nums),
         mode
     )
     return res
@@ -239,8 +628,8 @@ def xt_internal_setDel(dev_nums: List[int], delay: c_int) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_xt_internal_setDel(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
+        deviceArray(dev_nums),
+        len(dev_nums),
         delay
     )
     return res
@@ -254,10 +643,11 @@ def synchMS(dev_nums: List[int], mode: c_int) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_synchMS(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
+        deviceArray(dev_nums),
+        len(dev_nums),
         mode
     )
+    invalidateModInfo(dev_nums)
     return res
 
 
@@ -269,8 +659,8 @@ def measRun(dev_nums: List[int], mode: c_int) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_measRun(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
+        deviceArray(dev_nums),
+        len(dev_nums),
         mode
     )
     return res
@@ -283,8 +673,8 @@ def measStop(dev_nums: List[int]) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_measStop(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums))
+        deviceArray(dev_nums),
+        len(dev_nums)
     )
     return res
 
@@ -298,32 +688,62 @@ def measRdy(dev_nums: List[int]) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_measRdy(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums))
+        deviceArray(dev_nums),
+        len(dev_nums)
     )
     return res
 
 
 
-def measRead(dev_nums: List[int], buf_size_bytes: int = 4096) -> Tuple[bytes, int]:
+def measRead(dev_nums: List[int], buf_size_bytes: Optional[int] = None, buffer=None,
+             num_frames: int = 1) -> Tuple[Union[bytes, object], int]:
     """
     Reads the measurement data for all specified devices in non-blocking way.
     This functions is not blocking and returns immediately with the next measurement
     data or an error-code if no data are available.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+    buf_size_bytes : int, optional
+        number of bytes to read, defaults to the size of buffer or getFrameSize(dev_nums, num_frames)
+    buffer : writable buffer, optional
+        preallocated bytearray, memoryview, NumPy array or ctypes array the data is written to
+    num_frames : int
+        number of measurements to read one after the other into consecutive frames of the
+        buffer, fewer are read if no more data are available
+
+    Returns
+    -------
+    Tuple[bytes or buffer, int]
+        a copy of the data as bytes if no buffer was given, otherwise the given buffer
+        filled in place (no copy), and the number of elements read or negative error-code
+
+    Raises
+    ------
+    ValueError
+        if the buffer cannot hold num_frames measurements of the group
     """
     global c_ilmsens_hal
-    buffer = (c_byte * buf_size_bytes)(*([0x0] * buf_size_bytes))
-    num_elements = c_ilmsens_hal.ilmsens_hal_measRead(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
-        byref(buffer),
-        c_size_t(buf_size_bytes)
-    )
-    return bytes(buffer), num_elements
+    c_buffer, buf_size_bytes, frame_size = _frame_buffer(dev_nums, buffer, buf_size_bytes, num_frames)
+    if num_frames > 1:
+        num_elements = _read_frames(c_ilmsens_hal.ilmsens_hal_measRead, dev_nums, c_buffer, frame_size, num_frames)
+    else:
+        num_elements = c_ilmsens_hal.ilmsens_hal_measRead(
+            deviceArray(dev_nums),
+            len(dev_nums),
+            c_buffer,
+            c_size_t(buf_size_bytes)
+        )
+    if buffer is None:
+        return bytes(c_buffer), num_elements
+    return buffer, num_elements
 
 
 
-def measGet(dev_nums: List[int], buf_size_bytes: int = 4096, timeout_millis: int = 500) -> Tuple[bytes, int]:
+def measGet(dev_nums: List[int], buf_size_bytes: Optional[int] = None, timeout_millis: int = 500, buffer=None,
+            num_frames: int = 1) -> Tuple[Union[bytes, object], int]:
     """
     Blocks and reads the measurement data for all specified devices when it becomes available.
     This functions blocks the caller until at least one complete measurement is available for every device or a specified timeout expired.
@@ -331,21 +751,52 @@ def measGet(dev_nums: List[int], buf_size_bytes: int = 4096, timeout_millis: int
     i.e. it must be able to hold at least pNum complete datasets.
 
     Note: if pTimeoutMillis is 0, this function will block forever.
-    """
-    global c_ilmsens_hal
-    buffer = (c_byte * buf_size_bytes)(*([0x0] * buf_size_bytes))
-    num_elements = c_ilmsens_hal.ilmsens_hal_measGet(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
-        byref(buffer),
-        c_size_t(buf_size_bytes),
-        c_uint(timeout_millis)
-    )
-    return bytes(buffer), num_elements
 
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+    buf_size_bytes : int, optional
+        number of bytes to read, defaults to the size of buffer or getFrameSize(dev_nums, num_frames)
+    timeout_millis : int
+        timeout in milliseconds, applies to each measurement
+    buffer : writable buffer, optional
+        preallocated bytearray, memoryview, NumPy array or ctypes array the data is written to
+    num_frames : int
+        number of measurements to read one after the other into consecutive frames of the
+        buffer, fewer are read if a later one times out
 
+    Returns
+    -------
+    Tuple[bytes or buffer, int]
+        a copy of the data as bytes if no buffer was given, otherwise the given buffer
+        filled in place (no copy), and the number of elements read or negative error-code
 
-def readReg(dev_nums: List[int], reg: int, buf_size_bytes: int = 4) -> Tuple[bytes, int]:
+    Raises
+    ------
+    ValueError
+        if the buffer cannot hold num_frames measurements of the group
+    """
+    global c_ilmsens_hal
+    c_buffer, buf_size_bytes, frame_size = _frame_buffer(dev_nums, buffer, buf_size_bytes, num_frames)
+    if num_frames > 1:
+        num_elements = _read_frames(c_ilmsens_hal.ilmsens_hal_measGet, dev_nums, c_buffer, frame_size, num_frames,
+                                    timeout_millis)
+    else:
+        num_elements = c_ilmsens_hal.ilmsens_hal_measGet(
+            deviceArray(dev_nums),
+            len(dev_nums),
+            c_buffer,
+            c_size_t(buf_size_bytes),
+            timeout_millis
+        )
+    if buffer is None:
+        return bytes(c_buffer), num_elements
+    return buffer, num_elements
+
+
+
+def readReg(dev_nums: List[int], reg: int, buf_size_bytes: Optional[int] = None, buffer=None) -> Tuple[Union[bytes, object], int]:
     """
     Reads value from register at pReg address from all specified devices to buffer.
     The buffer pVal must be large enough to hold one word for each device, i.e. it must be at least pNum words in size.
@@ -356,17 +807,31 @@ def readReg(dev_nums: List[int], reg: int, buf_size_bytes: int = 4) -> Tuple[byt
         an array of device-indexes
     reg : int
         register address
+    buf_size_bytes : int, optional
+        size of the buffer, defaults to the size of buffer or one word per device
+    buffer : writable buffer, optional
+        preallocated bytearray, NumPy uint32 array or ctypes array the values are written to
+
+    Returns
+    -------
+    Tuple[bytes or buffer, int]
+        the values as bytes if no buffer was given, otherwise the given buffer,
+        and the number of words read or negative error-code
     """
     global c_ilmsens_hal
-    buffer = (c_byte * buf_size_bytes)(*([0x0] * buf_size_bytes))
+    if buffer is None and buf_size_bytes is None:
+        buf_size_bytes = len(dev_nums) * sizeof(ilmsens_hal_MemoryType)
+    c_buffer, buf_size_bytes = _c_buffer(buffer, buf_size_bytes)
     num_elements = c_ilmsens_hal.ilmsens_hal_readReg(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
-        c_uint(reg),
-        byref(buffer),
-        c_size_t(buf_size_bytes)
+        deviceArray(dev_nums),
+        len(dev_nums),
+        reg,
+        c_buffer,
+        buf_size_bytes
     )
-    return bytes(buffer), num_elements
+    if buffer is None:
+        return bytes(c_buffer), num_elements
+    return buffer, num_elements
 
 
 
@@ -386,16 +851,16 @@ def writeReg(dev_nums: List[int], reg: int, val: int) -> int:
     """
     global c_ilmsens_hal
     res = c_ilmsens_hal.ilmsens_hal_writeReg(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
-        c_uint(reg),
-        ilmsens_hal_MemoryType(val)
+        deviceArray(dev_nums),
+        len(dev_nums),
+        reg,
+        val
     )
     return res
 
 
 
-def readBlk(dev_nums: List[int], adr: int, num_el: int, buf_size_bytes: int) -> Tuple[bytes, int]:
+def readBlk(dev_nums: List[int], adr: int, num_el: int, buf_size_bytes: Optional[int] = None, buffer=None) -> Tuple[Union[bytes, object], int]:
     """
     Reads pNumEl elements (32-bit words) starting at address pAdr from the internal memory of specified devices into a buffer pVal.
     The buffer must be large enough to hold pNumEl words for all specified devices, i.e. it provide space for at least pNumEl x pNum words.
@@ -408,22 +873,36 @@ def readBlk(dev_nums: List[int], adr: int, num_el: int, buf_size_bytes: int) ->
         word-aligned start memory address
     num_el : int
         number of words (elements) to read
+    buf_size_bytes : int, optional
+        size of the buffer, defaults to the size of buffer or num_el words per device
+    buffer : writable buffer, optional
+        preallocated bytearray, NumPy uint32 array or ctypes array the words are written to
+
+    Returns
+    -------
+    Tuple[bytes or buffer, int]
+        the memory content as bytes if no buffer was given, otherwise the given buffer,
+        and the number of words copied or negative error-code
     """
     global c_ilmsens_hal
-    buffer = (c_byte * buf_size_bytes)(*([0x0] * buf_size_bytes))
+    if buffer is None and buf_size_bytes is None:
+        buf_size_bytes = len(dev_nums) * num_el * sizeof(ilmsens_hal_MemoryType)
+    c_buffer, buf_size_bytes = _c_buffer(buffer, buf_size_bytes)
     num_elements = c_ilmsens_hal.ilmsens_hal_readBlk(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
-        c_uint(adr),
-        c_uint(num_el),
-        byref(buffer),
-        c_size_t(buf_size_bytes)
+        deviceArray(dev_nums),
+        len(dev_nums),
+        adr,
+        num_el,
+        c_buffer,
+        buf_size_bytes
     )
-    return bytes(buffer), num_elements
+    if buffer is None:
+        return bytes(c_buffer), num_elements
+    return buffer, num_elements
 
 
 
-def writeBlk(dev_nums: List[int], adr: int, num_el: int, val: List[int]) -> int:
+def writeBlk(dev_nums: List[int], adr: int, num_el: int, val) -> int:
     """
     Writes pNumEl elements (32-bit words) from buffer pVal to internal memory starting at address pAdr of specified devices.
     The same content is written to each device, i.e. the buffer pVal must hold pNumEl words regardless of pNum.
@@ -436,17 +915,30 @@ def writeBlk(dev_nums: List[int], adr: int, num_el: int, val: List[int]) -> int:
         word-aligned start memory address
     num_el : int
         number of words (elements) to write
-    val : List[int]
-        a list with data to write
+    val : List[int] or buffer
+        the words to write, a list or a C-contiguous buffer of 32-bit words
+        (NumPy uint32 array, ctypes array, bytes), buffers are passed without copying
     """
     global c_ilmsens_hal
     s = sizeof(ilmsens_hal_MemoryType)
-    res = c_ilmsens_hal.ilmsens_hal_writeReg(
-        byref(c_uint(dev_nums[0])),
-        c_uint(len(dev_nums)),
-        c_uint(adr),
-        c_uint(num_el),
-        byref(bytes(val)),
-        c_size_t(len(val * s))
+    if isinstance(val, (list, tuple)):
+        val = (ilmsens_hal_MemoryType * len(val))(*val)
+    if isinstance(val, (Array, bytes)):
+        c_buffer, nbytes = val, sizeof(val) if isinstance(val, Array) else len(val)
+    else:
+        mem = memoryview(val)
+        if not mem.c_contiguous:
+            raise ValueError("val must be C-contiguous")
+        nbytes = mem.nbytes
+        c_buffer = bytes(mem) if mem.readonly else (c_byte * nbytes).from_buffer(mem)
+    if nbytes < num_el * s:
+        raise ValueError(f"val holds {nbytes // s} words, {num_el} requested")
+    res = c_ilmsens_hal.ilmsens_hal_writeBlk(
+        deviceArray(dev_nums),
+        len(dev_nums),
+        adr,
+        num_el,
+        c_buffer,
+        nbytes
     )
     return res
@@ -0,0 +1,118 @@
+import numpy as np
+from typing import Iterable, List, Optional, Tuple
+from . import ilmsens_hal as hal
+from .types import ilmsens_hal_MemoryType
+
+
+"""Words per readBlk/writeBlk call, larger transfers are split into chunks of this size"""
+CHUNK_WORDS = 16384
+
+"""Address increment per word, block addresses are word-aligned byte addresses"""
+ADDRESS_STEP = np.dtype(ilmsens_hal_MemoryType).itemsize
+
+MEMORY_DTYPE = np.dtype(ilmsens_hal_MemoryType)
+
+
+
+def _check(res: int, what: str) -> None:
+    if res < 0:
+        raise RuntimeError(f"{what} failed with error {res}")
+
+
+
+def read_block(dev_nums: List[int], adr: int, num_el: int, out: Optional[np.ndarray] = None,
+               chunk_words: int = CHUNK_WORDS) -> np.ndarray:
+    """
+    Reads num_el words starting at adr from the memory of all devices.
+
+    Transfers larger than chunk_words are split into several readBlk calls. For a single
+    device the HAL writes straight into out; for groups each chunk is read into a reused
+    staging buffer and scattered into the per-device rows.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+    adr : int
+        word-aligned start memory address
+    num_el : int
+        number of words to read per device
+    out : np.ndarray, optional
+        preallocated C-contiguous uint32 array of shape (devices, num_el)
+    chunk_words : int
+        maximum number of words per device and HAL call
+
+    Returns
+    -------
+    np.ndarray
+        the memory content of shape (devices, num_el), out if it was given
+    """
+    shape = (len(dev_nums), num_el)
+    if out is None:
+        out = np.empty(shape, dtype=MEMORY_DTYPE)
+    elif out.shape != shape or out.dtype != MEMORY_DTYPE or not out.flags.c_contiguous:
+        raise ValueError(f"out must be a C-contiguous uint32 array of shape {shape}")
+
+    staging = None
+    for start in range(0, num_el, chunk_words):
+        n = min(chunk_words, num_el - start)
+        if len(dev_nums) == 1:
+            target = out[0, start:start+n]
+        else:
+            if staging is None or staging.shape[1] != n:
+                staging = np.empty((len(dev_nums), n), dtype=MEMORY_DTYPE)
+            target = staging
+        _, res = hal.readBlk(dev_nums, adr + start * ADDRESS_STEP, n, buffer=target)
+        _check(res, "readBlk")
+        if target is staging:
+            out[:, start:start+n] = staging
+    return out
+
+
+
+def write_block(dev_nums: List[int], adr: int, data, chunk_words: int = CHUNK_WORDS) -> None:
+    """
+    Writes the same words to the memory of all devices, starting at adr.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+    adr : int
+        word-aligned start memory address
+    data : array_like
+        words to write; a C-contiguous uint32 array is passed to the HAL without copying
+    chunk_words : int
+        maximum number of words per HAL call
+    """
+    data = np.ascontiguousarray(data, dtype=MEMORY_DTYPE).reshape(-1)
+    for start in range(0, len(data), chunk_words):
+        chunk = data[start:start+chunk_words]
+        _check(hal.writeBlk(dev_nums, adr + start * ADDRESS_STEP, len(chunk), chunk), "writeBlk")
+
+
+
+def read_registers(dev_nums: List[int], regs: Iterable[int]) -> np.ndarray:
+    """
+    Reads several registers of all devices.
+
+    Returns
+    -------
+    np.ndarray
+        uint32 values of shape (registers, devices)
+    """
+    regs = list(regs)
+    out = np.empty((len(regs), len(dev_nums)), dtype=MEMORY_DTYPE)
+    for i, reg in enumerate(regs):
+        _, res = hal.readReg(dev_nums, reg, buffer=out[i])
+        _check(res, f"readReg({reg:#x})")
+    return out
+
+
+
+def write_registers(dev_nums: List[int], values: Iterable[Tuple[int, int]]) -> None:
+    """
+    Writes (register, value) pairs to all devices, in the given order.
+    """
+    for reg, val in values:
+        _check(hal.writeReg(dev_nums, reg, int(val)), f"writeReg({reg:#x})")
@@ -0,0 +1,167 @@
+import bisect
+import numpy as np
+from typing import Optional, Sequence
+
+
+"""Sequence counters are 32 bit words that wrap around"""
+SEQ_MODULUS = 1 << 32
+
+"""Default upper bin edges of LatencyHistogram [us]: 1, 2, 5, 10, ... 10 s"""
+LATENCY_BOUNDS_US = [m * 10 ** e for e in range(8) for m in (1, 2, 5)][:-2]
+
+
+
+class SequenceTracker:
+    """
+    Frame-loss accounting from the per-device sequence counters.
+
+    Each device increments its counter by one per measurement, so comparing consecutive
+    counters reveals sweeps the host never read (HAL ring overflow, dropped reads).
+    The counters are unwrapped into 64 bit and compared against the highest counter seen
+    so far: a step of n > 1 counts n - 1 lost frames, a repeated counter a duplicate, and
+    a counter below the maximum an out-of-order frame (a late frame is not deducted from
+    the lost frames it had previously been counted as).
+
+    Parameters
+    ----------
+    num_devices : int
+        number of devices in each frame
+    """
+
+    def __init__(self, num_devices: int):
+        self.num_devices = num_devices
+        self.reset()
+
+    def reset(self) -> None:
+        self.frames = 0
+        self.lost = np.zeros(self.num_devices, dtype=np.int64)
+        self.duplicated = np.zeros(self.num_devices, dtype=np.int64)
+        self.out_of_order = np.zeros(self.num_devices, dtype=np.int64)
+        self._last: Optional[np.ndarray] = None # unwrapped counter of the previous frame
+        self._max: Optional[np.ndarray] = None # highest unwrapped counter so far
+
+    def update(self, seq_counter) -> None:
+        """
+        Accounts a batch of frames.
+
+        Parameters
+        ----------
+        seq_counter : array_like
+            sequence counters of shape (frames, devices), e.g. from decode_frames,
+            or (devices,) for a single frame
+        """
+        seq = np.asarray(seq_counter, dtype=np.int64).reshape(-1, self.num_devices) % SEQ_MODULUS
+        if not len(seq):
+            return
+        if self._last is None:
+            self._last = seq[0].copy()
+            self._max = seq[0].copy()
+            seq = seq[1:]
+            self.frames += 1
+            if not len(seq):
+                return
+
+        # unwrap: the signed 32 bit difference to the previous frame
+        steps = np.diff(seq, axis=0, prepend=(self._last % SEQ_MODULUS)[np.newaxis])
+        steps = (steps + SEQ_MODULUS // 2) % SEQ_MODULUS - SEQ_MODULUS // 2
+        unwrapped = self._last + np.cumsum(steps, axis=0)
+        highest = np.maximum.accumulate(np.vstack((self._max, unwrapped)), axis=0)
+        delta = unwrapped - highest[:-1]
+
+        self.lost += np.where(delta > 1, delta - 1, 0).sum(axis=0)
+        self.duplicated += (delta == 0).sum(axis=0)
+        self.out_of_order += (delta < 0).sum(axis=0)
+        self._last = unwrapped[-1]
+        self._max = highest[-1]
+        self.frames += len(seq)
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "lost": self.lost.tolist(),
+            "duplicated": self.duplicated.tolist(),
+            "out_of_order": self.out_of_order.tolist(),
+        }
+
+
+
+class LatencyHistogram:
+    """
+    Histogram of call durations with fixed bins, cheap enough to record every measGet.
+
+    Parameters
+    ----------
+    bounds_us : Sequence[float]
+        ascending upper bin edges [us]; longer durations fall into an overflow bin
+    """
+
+    def __init__(self, bounds_us: Sequence[float] = LATENCY_BOUNDS_US):
+        self.bounds_us = list(bounds_us)
+        self._bounds_ns = [b * 1000 for b in self.bounds_us]
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.bounds_us) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns: int) -> None:
+        self.counts[bisect.bisect_left(self._bounds_ns, duration_ns)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bin edge [us] below which the fraction q of the durations lies (inf for the overflow bin).
+        """
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        return self.bounds_us[index] if index < len(self.bounds_us) else float("inf")
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_us": self.total_ns / self.count / 1000.0 if self.count else 0.0,
+            "max_us": self.max_ns / 1000.0,
+            "p50_us": self.quantile(0.5),
+            "p99_us": self.quantile(0.99),
+            "bounds_us": self.bounds_us,
+            "counts": list(self.counts),
+        }
+
+
+
+class FillLevel:
+    """
+    Statistics of the measRdy fill level of the HAL ring buffer (datasets waiting).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.samples = 0
+        self.last = 0
+        self.max = 0
+        self.total = 0
+
+    def record(self, level: int) -> None:
+        if level < 0:
+            return # error-code, not a level
+        self.samples += 1
+        self.last = level
+        self.total += level
+        if level > self.max:
+            self.max = level
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "last": self.last,
+            "max": self.max,
+            "mean": self.total / self.samples if self.samples else 0.0,
+        }
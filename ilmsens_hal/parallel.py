@@ -0,0 +1,204 @@
+import os
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Iterable, Iterator, List, Optional
+from .buffers import attachSharedMemory
+from .types import ilmsens_hal_ModInfo
+from .utils import Correlator
+from .utils import value_scale
+
+
+"""Minimum number of channels (rows of samples) per task, smaller shards cost more in dispatch than they gain"""
+MIN_ROWS_PER_TASK = 4
+
+
+
+# ---------------------------------------------------------------------- worker side
+
+_correlator: Optional[Correlator] = None
+_attached: "OrderedDict[str, shared_memory.SharedMemory]" = OrderedDict()
+_MAX_ATTACHED = 32
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = _attached.get(name)
+    if shm is not None:
+        _attached.move_to_end(name)
+        return shm
+    shm = attachSharedMemory(name)
+    _attached[name] = shm
+    if len(_attached) > _MAX_ATTACHED:
+        _attached.popitem(last=False)[1].close()
+    return shm
+
+
+def _init_worker(order: int, clk: float, ov: int, scale: float, dtype: str) -> None:
+    global _correlator
+    _correlator = Correlator(mDR_MLBS_Order=order, mDR_F0_Clk=clk, mDR_OV=ov, scale=scale, dtype=dtype)
+
+
+def _correlate_rows(input_name: str, output_name: str, num_rows: int, start: int, stop: int) -> int:
+    n = _correlator.num_samples
+    samples = np.ndarray((num_rows, n), dtype=np.int32, buffer=_attach(input_name).buf)
+    out = np.ndarray((num_rows, n), dtype=_correlator.dtype, buffer=_attach(output_name).buf)
+    _correlator.correlate(samples[start:stop], out=out[start:stop])
+    return stop - start
+
+
+
+# ---------------------------------------------------------------------- parent side
+
+class _Slot:
+    """
+    A pair of shared-memory blocks holding one batch of raw samples and its correlation.
+    """
+
+    def __init__(self):
+        self.input: Optional[shared_memory.SharedMemory] = None
+        self.output: Optional[shared_memory.SharedMemory] = None
+        self.capacity = 0 # rows
+        self.shape = ()
+        self.futures: List = []
+
+    def reserve(self, num_rows: int, num_samples: int, dtype: np.dtype) -> None:
+        if num_rows <= self.capacity:
+            return
+        self.release()
+        self.input = shared_memory.SharedMemory(create=True, size=num_rows * num_samples * 4)
+        self.output = shared_memory.SharedMemory(create=True, size=num_rows * num_samples * dtype.itemsize)
+        self.capacity = num_rows
+
+    def release(self) -> None:
+        for shm in (self.input, self.output):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self.input = self.output = None
+        self.capacity = 0
+
+
+
+class ParallelCorrelator:
+    """
+    Correlator sharding batches of frames across a pool of worker processes.
+
+    Each batch is copied once into a shared-memory block, the channels (rows of samples)
+    are split into contiguous shards correlated by the workers in place, and the result is
+    copied out of a second shared block, so no array is ever pickled. Results keep the order
+    of the input; imap() keeps several batches in flight to overlap copying and computing.
+    Results are never views of the shared blocks, which are unmapped when they are resized
+    or the correlator is closed.
+
+    Parameters
+    ----------
+    mod_info : ilmsens_hal_ModInfo, optional
+        device configuration; provides MLBS order, clock, OV and the value scale
+    workers : int, optional
+        number of worker processes, defaults to the number of CPUs
+    num_slots : int
+        number of batches imap() keeps in flight
+    mDR_MLBS_Order, mDR_F0_Clk, mDR_OV, scale, dtype
+        as for Correlator
+    """
+
+    def __init__(self, mod_info: Optional[ilmsens_hal_ModInfo] = None, workers: Optional[int] = None,
+                 num_slots: int = 2, mDR_MLBS_Order: int = 9, mDR_F0_Clk: float = 13.312, mDR_OV: int = 1,
+                 scale: Optional[float] = None, dtype=np.float32):
+        if mod_info is not None:
+            mDR_MLBS_Order = mod_info.mConfig.mOrder
+            mDR_F0_Clk = mod_info.mConfig.mClk
+            mDR_OV = mod_info.mConfig.mOV
+            if scale is None:
+                scale = value_scale(mod_info)
+        if scale is None:
+            scale = 1.0
+        if num_slots < 1:
+            raise ValueError("num_slots must be at least 1")
+
+        self.dtype = np.dtype(dtype)
+        self.num_samples = ((1 << mDR_MLBS_Order) - 1) * mDR_OV
+        self.workers = workers or os.cpu_count() or 1
+        self._slots = [_Slot() for _ in range(num_slots)]
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(mDR_MLBS_Order, mDR_F0_Clk, mDR_OV, scale, self.dtype.name)
+        )
+
+    def close(self) -> None:
+        """
+        Shuts the worker processes down and frees the shared memory.
+        """
+        self._pool.shutdown(wait=True)
+        for slot in self._slots:
+            slot.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _submit(self, slot: _Slot, samples: np.ndarray) -> None:
+        if samples.shape[-1] != self.num_samples:
+            raise ValueError(f"expected {self.num_samples} samples per channel, got {samples.shape[-1]}")
+        if not np.can_cast(samples.dtype, np.int32):
+            # the shared input slot holds raw int32 samples, anything else would be truncated or wrapped
+            raise TypeError(f"samples must be raw int32 samples (or a narrower integer type), got {samples.dtype}")
+        num_rows = samples.size // self.num_samples
+        slot.reserve(num_rows, self.num_samples, self.dtype)
+        shared = np.ndarray(samples.shape, dtype=np.int32, buffer=slot.input.buf)
+        np.copyto(shared, samples)
+
+        shard = max(MIN_ROWS_PER_TASK, -(-num_rows // self.workers))
+        slot.futures = [
+            self._pool.submit(_correlate_rows, slot.input.name, slot.output.name, num_rows, start, min(start + shard, num_rows))
+            for start in range(0, num_rows, shard)
+        ]
+        slot.shape = samples.shape
+
+    def _collect(self, slot: _Slot, out: Optional[np.ndarray]) -> np.ndarray:
+        for future in slot.futures:
+            future.result()
+        slot.futures = []
+        result = np.ndarray(slot.shape, dtype=self.dtype, buffer=slot.output.buf)
+        if out is None:
+            return result.copy()
+        out[...] = result
+        return out
+
+    def correlate(self, samples: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Scales and correlates a batch of raw frames, see Correlator.correlate.
+
+        Raises TypeError unless samples are int32 or a narrower integer type, which the
+        shared input block holds without loss.
+        """
+        if out is not None and (out.shape != samples.shape or out.dtype != self.dtype):
+            raise ValueError("out must match the shape of samples and the correlator's dtype")
+        slot = self._slots[0]
+        self._submit(slot, samples)
+        return self._collect(slot, out)
+
+    __call__ = correlate
+
+    def imap(self, batches: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """
+        Correlates a stream of batches with up to num_slots of them in flight.
+
+        Yields the results in input order.
+        """
+        pending = []
+        free = list(self._slots)
+        for batch in batches:
+            if not free:
+                slot = pending.pop(0)
+                yield self._collect(slot, None)
+                free.append(slot)
+            slot = free.pop()
+            self._submit(slot, batch)
+            pending.append(slot)
+        for slot in pending:
+            yield self._collect(slot, None)
@@ -0,0 +1,282 @@
+import time
+import numpy as np
+from typing import Iterator, List, Optional
+from . import ilmsens_hal as hal
+from .defn import meas_run
+from .error import ILMSENS_ERROR_AGAIN
+from .error import ILMSENS_ERROR_TIMEOUT
+from .monitor import FillLevel
+from .monitor import LatencyHistogram
+from .monitor import SequenceTracker
+from .types import ilmsens_hal_ModInfo
+from .types import ilmsens_hal_SampleType
+
+
+"""Weight of a new inter-arrival measurement in the sweep period estimate"""
+PERIOD_SMOOTHING = 0.1
+
+"""Default fraction of one core the polling may use"""
+CPU_BUDGET = 0.05
+
+
+
+def sweep_period(mod_info: ilmsens_hal_ModInfo) -> float:
+    """
+    Time between two measurements [s] of a device, from its configuration.
+
+    Follows the timing relations of the programming guide (eq. 3.1 - 3.6):
+    T_IRF = D x (2^m - 1) / f0, T_HW-Avg = (HWAvg + 1) x T_IRF and
+    T_Tot = (SWAvg + WC) x T_HW-Avg, with the MLBS order m, the clock f0 [GHz]
+    and the prescaler D (mSub) of the ModConfig.
+
+    Parameters
+    ----------
+    mod_info : ilmsens_hal_ModInfo
+        configuration of the device (or a ModInfoSnapshot)
+
+    Returns
+    -------
+    float
+        the measurement period T_Tot [s], 0.0 if the configuration is incomplete
+    """
+    config = mod_info.mConfig
+    if not config.mClk:
+        return 0.0
+    t_irf = config.mSub * (2**config.mOrder - 1) / (config.mClk * 1e9)
+    t_hw_avg = (mod_info.mHWAvg + 1) * t_irf
+    return (mod_info.mAvg + mod_info.mWait) * t_hw_avg
+
+
+
+class PollingScheduler:
+    """
+    Reads a measurement in ILMSENS_HAL_RUN_RAW mode without spinning on measRdy.
+
+    In raw mode data only move from the devices to the HAL when the host calls measRdy.
+    The scheduler sleeps until shortly before the next measurement is due, then polls
+    measRdy at the poll interval until data are ready and reads everything available with
+    measRead into a preallocated batch. The measurement period starts from sweep_period()
+    and is refined by the measured inter-arrival times, so it follows the devices when the
+    configuration estimate is off.
+
+    The poll interval trades latency against CPU: it is target_latency, but never shorter
+    than the measured cost of a poll divided by cpu_budget. A ready measurement is thus
+    read at most about one poll interval after it arrived.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+    mod_info : ilmsens_hal_ModInfo
+        configuration of the devices, used to size the frames and estimate the period
+    target_latency : float, optional
+        poll interval [s], defaults to a tenth of the estimated period
+    cpu_budget : float
+        fraction of a core the polls may use, bounds the poll interval from below
+    max_batch : int
+        maximum number of measurements read per wake-up
+    num_buffers : int
+        number of batch buffers in rotation; a batch stays valid until num_buffers - 1 later batches were read
+    """
+
+    def __init__(self, dev_nums: List[int], mod_info: ilmsens_hal_ModInfo, target_latency: Optional[float] = None,
+                 cpu_budget: float = CPU_BUDGET, max_batch: int = 64, num_buffers: int = 2):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        if not 0.0 < cpu_budget <= 1.0:
+            raise ValueError("cpu_budget must be in (0, 1]")
+
+        self.dev_nums = list(dev_nums)
+        self.cpu_budget = cpu_budget
+        self.max_batch = max_batch
+
+        self.nominal_period = sweep_period(mod_info)
+        self.period = self.nominal_period
+        self.target_latency = target_latency if target_latency is not None else self.nominal_period / 10.0
+
+        s = np.dtype(ilmsens_hal_SampleType).itemsize
+        self._seq_index = mod_info.mNumSamp + mod_info.mConfig.mOV - 1
+        self._device_words = hal.deviceFrameSize(mod_info) // s
+        self.buf_size_bytes = self._device_words * len(self.dev_nums) * s
+        self._batches = [np.empty((max_batch, len(self.dev_nums), self._device_words), dtype=ilmsens_hal_SampleType)
+                         for _ in range(max(1, num_buffers))]
+        self._next_batch = 0
+
+        self.sequence = SequenceTracker(len(self.dev_nums))
+        self.latency = LatencyHistogram()
+        self.fill_level = FillLevel()
+        self._running = False
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.sequence.reset()
+        self.latency.reset()
+        self.fill_level.reset()
+        self.polls = 0
+        self.empty_polls = 0
+        self.frames_received = 0
+        self.errors = 0
+        self.last_error = 0
+        self.busy_ns = 0
+        self._poll_ns = 0.0 # smoothed cost of one measRdy call
+        self._started = time.monotonic()
+        self._last_arrival: Optional[float] = None
+        self._due = self._started
+
+    # ------------------------------------------------------------------ control
+
+    def start(self, run: bool = True) -> None:
+        """
+        Starts the measurement run in raw mode unless run is False.
+        """
+        if self._running:
+            raise RuntimeError("scheduler already started")
+        if run:
+            res = hal.measRun(self.dev_nums, meas_run.ILMSENS_HAL_RUN_RAW)
+            if res < 0:
+                raise RuntimeError(f"measRun failed with error {res}")
+        self.period = self.nominal_period
+        self.reset_stats()
+        self._running = True
+
+    def stop(self, run: bool = True) -> None:
+        """
+        Stops the measurement run unless run is False.
+        """
+        if not self._running:
+            return
+        self._running = False
+        if run:
+            hal.measStop(self.dev_nums)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def poll_interval(self) -> float:
+        """
+        Current time [s] between two polls while waiting for a due measurement.
+        """
+        return max(self.target_latency, self._poll_ns / 1e9 / self.cpu_budget)
+
+    # ------------------------------------------------------------------ reading
+
+    def _poll(self) -> int:
+        start = time.perf_counter_ns()
+        level = hal.measRdy(self.dev_nums)
+        duration = time.perf_counter_ns() - start
+        self._poll_ns += PERIOD_SMOOTHING * (duration - self._poll_ns) if self._poll_ns else duration
+        self.busy_ns += duration
+        self.polls += 1
+        if level < 0:
+            self.errors += 1
+            self.last_error = level
+        else:
+            self.fill_level.record(level)
+            if level == 0:
+                self.empty_polls += 1
+        return level
+
+    def _read(self, batch: np.ndarray, available: int) -> int:
+        start = time.perf_counter_ns()
+        count = min(available, self.max_batch)
+        _, res = hal.measRead(self.dev_nums, buffer=batch[:count], num_frames=count)
+        if res > 0:
+            count = res // batch[0].size
+        else:
+            count = 0
+            if res not in (0, ILMSENS_ERROR_AGAIN.value, ILMSENS_ERROR_TIMEOUT.value):
+                self.errors += 1
+                self.last_error = res
+        duration = time.perf_counter_ns() - start
+        self.busy_ns += duration
+        if count:
+            self.latency.record(duration)
+        return count
+
+    def _arrived(self, now: float, count: int, available: int) -> None:
+        """Refines the period from the measurements that arrived since the last read."""
+        if self._last_arrival is not None and available <= count:
+            # all pending measurements were read, so the newest arrived within the last poll interval
+            measured = (now - self._last_arrival) / count
+            self.period += PERIOD_SMOOTHING * (measured - self.period)
+        self._last_arrival = now
+        if available > count:
+            self._due = now # more than max_batch were pending, read the rest right away
+        else:
+            # the next measurement arrives after (now - poll_interval, now] + period, wake up ahead of it
+            self._due = now + self.period - self.poll_interval
+
+    def read(self, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Waits for the next measurements and reads all that are available.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            seconds to wait at most, defaults to waiting for ten periods
+
+        Returns
+        -------
+        np.ndarray
+            int32 frames of shape (frames, devices, rx x channel words), empty on timeout;
+            a view of a batch buffer that is reused by later reads
+        """
+        batch = self._batches[self._next_batch]
+        now = time.monotonic()
+        deadline = now + (timeout if timeout is not None else 10.0 * max(self.period, self.poll_interval))
+        if self._due > now:
+            time.sleep(min(self._due, deadline) - now)
+        while True:
+            available = self._poll()
+            now = time.monotonic()
+            if available > 0:
+                count = self._read(batch, available)
+                if count:
+                    self._next_batch = (self._next_batch + 1) % len(self._batches)
+                    self.frames_received += count
+                    self.sequence.update(batch[:count, :, self._seq_index])
+                    self._arrived(now, count, available)
+                    return batch[:count]
+            if now >= deadline:
+                return batch[:0]
+            time.sleep(min(self.poll_interval, deadline - now))
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        """
+        Yields the batches read until the scheduler is stopped.
+        """
+        while self._running:
+            batch = self.read()
+            if len(batch):
+                yield batch
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the scheduler counters.
+
+        cpu_load is the fraction of the elapsed time spent in HAL calls.
+        """
+        elapsed = time.monotonic() - self._started
+        return {
+            "frames_received": self.frames_received,
+            "polls": self.polls,
+            "empty_polls": self.empty_polls,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "nominal_period": self.nominal_period,
+            "period": self.period,
+            "poll_interval": self.poll_interval,
+            "cpu_load": self.busy_ns / 1e9 / elapsed if elapsed > 0 else 0.0,
+            "sequence": self.sequence.stats(),
+            "latency": self.latency.stats(),
+            "fill_level": self.fill_level.stats(),
+        }
@@ -0,0 +1,576 @@
+import os
+import queue
+import socket
+import stat
+import threading
+import time
+import numpy as np
+from ctypes import LittleEndianStructure
+from ctypes import c_char
+from ctypes import c_double
+from ctypes import c_uint
+from ctypes import c_uint64
+from ctypes import sizeof
+from typing import Iterator, List, Optional, Tuple, Union
+from . import ilmsens_hal as hal
+from .capture import CaptureDevice
+from .types import ilmsens_hal_ModInfo
+from .types import modInfoStruct
+from .utils import decode_frames
+from .utils.pipeline import Batch
+from .utils.pipeline import Sink
+
+
+SERVER_MAGIC = b"ILMS"
+PROTOCOL_VERSION = 1
+
+"""Message types: stream description sent once on connect, batch of frames"""
+MSG_INFO = 1
+MSG_FRAMES = 2
+
+"""Content of the published frames, stored in StreamInfo.mKind"""
+KIND_RAW = 0
+KIND_CORRELATED = 1
+
+"""Payload encodings: wire code and NumPy dtype; int16 and float16 are stored with a per-batch scale"""
+ENCODINGS = {
+    "int32": (0, np.dtype("<i4")),
+    "float32": (1, np.dtype("<f4")),
+    "float64": (2, np.dtype("<f8")),
+    "float16": (3, np.dtype("<f2")),
+    "int16": (4, np.dtype("<i2")),
+}
+_ENCODING_CODES = {code: (name, dtype) for name, (code, dtype) in ENCODINGS.items()}
+
+"""Queued messages a subscriber sender coalesces into one send, up to this many bytes"""
+SEND_BATCH_BYTES = 1 << 20
+
+
+class MessageHeader(LittleEndianStructure):
+    _fields_ = [
+        ("mMagic", c_char * 4), # SERVER_MAGIC
+        ("mType", c_uint), # MSG_INFO or MSG_FRAMES
+        ("mLength", c_uint64), # number of bytes following the header
+    ]
+
+class StreamInfo(LittleEndianStructure):
+    _fields_ = [
+        ("mVersion", c_uint), # protocol version
+        ("mNumDevices", c_uint), # number of CaptureDevice records following
+        ("mKind", c_uint), # KIND_RAW or KIND_CORRELATED
+        ("mReserved", c_uint),
+        ("mStartTime", c_double), # UNIX time the server was started
+    ]
+
+class BatchHeader(LittleEndianStructure):
+    _fields_ = [
+        ("mIndex", c_uint64), # running number of the batch
+        ("mTimestamp", c_double), # UNIX time of the batch
+        ("mNumFrames", c_uint), # shape of the payload (frames, devices, rx, samples)
+        ("mNumDevices", c_uint),
+        ("mNumRx", c_uint),
+        ("mNumSamples", c_uint),
+        ("mEncoding", c_uint), # wire code of ENCODINGS
+        ("mReserved", c_uint),
+        ("mScale", c_double), # value = payload x mScale (int16 and float16, 1.0 otherwise)
+    ]
+    # followed by the int32 sequence counters (frames, devices) and the payload
+
+
+
+def _socket_family(address) -> int:
+    return socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+
+
+
+def _recv_exact(sock: socket.socket, nbytes: int) -> Optional[bytearray]:
+    """Receives exactly nbytes, None if the peer closed the connection before."""
+    data = bytearray(nbytes)
+    view = memoryview(data)
+    received = 0
+    while received < nbytes:
+        n = sock.recv_into(view[received:])
+        if not n:
+            return None
+        received += n
+    return data
+
+
+
+def encode_batch(data: np.ndarray, seq_counter: Optional[np.ndarray] = None, encoding: Optional[str] = None,
+                 index: int = 0, timestamp: Optional[float] = None) -> bytearray:
+    """
+    Builds a MSG_FRAMES message of a batch of frames.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        frames of shape (frames, devices, rx, samples), or (devices, rx, samples) for a single one
+    seq_counter : np.ndarray, optional
+        sequence counters of shape (frames, devices), -1 if not given
+    encoding : str, optional
+        key of ENCODINGS, defaults to the dtype of data
+    index : int
+        running number of the batch
+    timestamp : float, optional
+        UNIX time of the batch, defaults to now
+
+    Returns
+    -------
+    bytearray
+        the message including its MessageHeader
+    """
+    data = np.asarray(data)
+    if data.ndim == 3:
+        data = data[np.newaxis]
+    if data.ndim != 4:
+        raise ValueError(f"data must have shape (frames, devices, rx, samples), not {data.shape}")
+    if encoding is None:
+        encoding = data.dtype.name
+    if encoding not in ENCODINGS:
+        raise ValueError(f"unknown encoding '{encoding}'")
+    code, dtype = ENCODINGS[encoding]
+
+    num_frames, num_devices, num_rx, num_samples = data.shape
+    num_seq = num_frames * num_devices
+    offset_seq = sizeof(MessageHeader) + sizeof(BatchHeader)
+    offset_data = offset_seq + num_seq * 4
+    message = bytearray(offset_data + data.size * dtype.itemsize)
+
+    header = MessageHeader.from_buffer(message)
+    header.mMagic = SERVER_MAGIC
+    header.mType = MSG_FRAMES
+    header.mLength = len(message) - sizeof(MessageHeader)
+
+    batch = BatchHeader.from_buffer(message, sizeof(MessageHeader))
+    batch.mIndex = index
+    batch.mTimestamp = time.time() if timestamp is None else timestamp
+    batch.mNumFrames, batch.mNumDevices, batch.mNumRx, batch.mNumSamples = data.shape
+    batch.mEncoding = code
+    batch.mScale = 1.0
+
+    seq = np.frombuffer(message, dtype="<i4", count=num_seq, offset=offset_seq)
+    if seq_counter is None:
+        seq[:] = -1
+    else:
+        seq[:] = np.asarray(seq_counter).reshape(-1)
+
+    payload = np.frombuffer(message, dtype=dtype, offset=offset_data).reshape(data.shape)
+    if encoding in ("int16", "float16"):
+        # scale into the range of the encoding: int16 always, float16 only if it would overflow
+        peak = float(np.max(np.abs(data))) if data.size else 0.0
+        limit = float(np.iinfo(np.int16).max) if encoding == "int16" else float(np.finfo(np.float16).max)
+        scale = peak / limit if peak and (encoding == "int16" or peak > limit) else 1.0
+        if encoding == "int16":
+            np.rint(data / scale, out=payload, casting="unsafe")
+        else:
+            np.divide(data, scale, out=payload, casting="unsafe")
+        BatchHeader.from_buffer(message, sizeof(MessageHeader)).mScale = scale
+    else:
+        np.copyto(payload, data, casting="unsafe")
+    return message
+
+
+
+def decode_batch(message, decode: bool = True) -> Batch:
+    """
+    Parses the body (without MessageHeader) of a MSG_FRAMES message.
+
+    Parameters
+    ----------
+    message : bytes-like
+        the message body
+    decode : bool
+        convert float16 and scaled int16 payloads to float32, otherwise the payload is
+        returned as a view in its wire encoding
+
+    Returns
+    -------
+    Batch
+        data of shape (frames, devices, rx, samples), seq_counter of shape (frames, devices)
+    """
+    header = BatchHeader.from_buffer_copy(message)
+    name, dtype = _ENCODING_CODES[header.mEncoding]
+    shape = (header.mNumFrames, header.mNumDevices, header.mNumRx, header.mNumSamples)
+    num_seq = header.mNumFrames * header.mNumDevices
+    offset = sizeof(BatchHeader)
+    seq_counter = np.frombuffer(message, dtype="<i4", count=num_seq, offset=offset).reshape(shape[:2])
+    data = np.frombuffer(message, dtype=dtype, count=int(np.prod(shape)), offset=offset + num_seq * 4).reshape(shape)
+    if decode and name in ("int16", "float16"):
+        data = np.multiply(data, np.float32(header.mScale), dtype=np.float32)
+
+    batch = Batch(header.mIndex, data, header.mTimestamp)
+    batch.seq_counter = seq_counter
+    return batch
+
+
+
+class _Subscriber:
+    __slots__ = ("sock", "peer", "queue", "thread", "sent", "dropped")
+
+    def __init__(self, sock: socket.socket, peer, max_queue: int):
+        self.sock = sock
+        self.peer = peer
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.dropped = 0
+
+
+
+_CLOSE = object()
+
+
+class FrameServer:
+    """
+    Publishes frames of one device group to local subscribers over a TCP or Unix socket.
+
+    Every subscriber first receives a MSG_INFO message (StreamInfo and one CaptureDevice
+    record per device, holding device-index, identifier and ModInfo), then one MSG_FRAMES
+    message per published batch. Each message starts with a MessageHeader giving its length.
+
+    A batch is encoded once and queued for every subscriber; a sender thread per subscriber
+    writes its queue to the socket, coalescing queued messages into a single send. When a
+    subscriber falls max_queue messages behind, its oldest queued batch is dropped, so a
+    slow consumer never stalls the acquisition or the other subscribers.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        device-indexes of the published group
+    address : tuple or str
+        (host, port) to listen on with TCP, port 0 picks a free one, or the path of a Unix socket
+    mod_infos : List[ilmsens_hal_ModInfo], optional
+        configuration of each device, the cached getModInfoSnapshot if omitted
+    mod_ids : List[bytes], optional
+        identifier of each device, queried with getModId if omitted
+    kind : int
+        KIND_RAW or KIND_CORRELATED, announced to the subscribers
+    encoding : str, optional
+        key of ENCODINGS for the payload, e.g. "float16" or "int16" to halve the bandwidth;
+        defaults to the dtype of the published data
+    max_queue : int
+        number of batches queued per subscriber before the oldest is dropped
+    """
+
+    def __init__(self, dev_nums: List[int], address: Union[Tuple[str, int], str] = ("127.0.0.1", 0),
+                 mod_infos: Optional[List[ilmsens_hal_ModInfo]] = None, mod_ids: Optional[List[bytes]] = None,
+                 kind: int = KIND_RAW, encoding: Optional[str] = None, max_queue: int = 16):
+        if encoding is not None and encoding not in ENCODINGS:
+            raise ValueError(f"unknown encoding '{encoding}'")
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        if mod_infos is None:
+            mod_infos = [hal.getModInfoSnapshot(dev_num) for dev_num in dev_nums]
+        if mod_ids is None:
+            mod_ids = [hal.getModId(dev_num) for dev_num in dev_nums]
+
+        self.dev_nums = list(dev_nums)
+        self.mod_infos = list(mod_infos)
+        self.encoding = encoding
+        self.max_queue = max_queue
+        self.address = address
+
+        info = StreamInfo()
+        info.mVersion = PROTOCOL_VERSION
+        info.mNumDevices = len(self.dev_nums)
+        info.mKind = kind
+        info.mStartTime = time.time()
+        devices = (CaptureDevice * len(self.dev_nums))()
+        for device, dev_num, mod_info, mod_id in zip(devices, self.dev_nums, mod_infos, mod_ids):
+            device.mDevNum = dev_num
+            device.mModId = mod_id
+            device.mInfo = modInfoStruct(mod_info)
+        header = MessageHeader(SERVER_MAGIC, MSG_INFO, sizeof(info) + sizeof(devices))
+        self._info_message = bytes(header) + bytes(info) + bytes(devices)
+
+        self._listener: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._subscribers: List[_Subscriber] = []
+        self.batches_published = 0
+        self.bytes_published = 0
+
+    # ------------------------------------------------------------------ control
+
+    def start(self) -> None:
+        """
+        Starts listening; address then holds the bound address (e.g. the chosen port).
+        """
+        if self._listener is not None:
+            raise RuntimeError("server already started")
+        family = _socket_family(self.address)
+        if family == socket.AF_UNIX and os.path.exists(self.address) and stat.S_ISSOCK(os.stat(self.address).st_mode):
+            os.unlink(self.address) # stale socket of a previous server
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(self.address)
+        listener.listen()
+        listener.settimeout(0.1)
+        self.address = listener.getsockname()
+        self._listener = listener
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._accept, name="ilmsens-server", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 1.0) -> None:
+        """
+        Stops accepting, sends what is queued for each subscriber within timeout and disconnects them.
+        """
+        if self._listener is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._listener.close()
+        if _socket_family(self.address) == socket.AF_UNIX:
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+        self._listener = None
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put(_CLOSE, timeout=timeout)
+            except queue.Full:
+                pass
+        deadline = time.monotonic() + timeout
+        for subscriber in subscribers:
+            subscriber.thread.join(max(0.0, deadline - time.monotonic()))
+            self._disconnect(subscriber)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------ publishing
+
+    def publish(self, data: np.ndarray, seq_counter: Optional[np.ndarray] = None,
+                timestamp: Optional[float] = None) -> int:
+        """
+        Queues a batch of frames for all subscribers.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            raw samples or impulse responses of shape (frames, devices, rx, samples)
+            or (devices, rx, samples)
+        seq_counter : np.ndarray, optional
+            sequence counters of shape (frames, devices)
+        timestamp : float, optional
+            UNIX time of the batch, defaults to now
+
+        Returns
+        -------
+        int
+            the number of subscribers the batch was queued for
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        index = self.batches_published
+        self.batches_published += 1
+        if not subscribers:
+            return 0
+        message = encode_batch(data, seq_counter, self.encoding, index, timestamp)
+        self.bytes_published += len(message)
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.queue.put_nowait(message)
+                    break
+                except queue.Full:
+                    pass
+                try:
+                    subscriber.queue.get_nowait() # slow consumer: drop its oldest batch
+                    subscriber.dropped += 1
+                except queue.Empty:
+                    pass
+        return len(subscribers)
+
+    def publish_buffer(self, buffer, num_devices: Optional[int] = None) -> int:
+        """
+        Publishes the raw frames of a measGet/measRead buffer, see publish().
+        """
+        samples, seq_counter = decode_frames(buffer, self.mod_infos[0], num_devices=num_devices or len(self.dev_nums))
+        return self.publish(samples, seq_counter)
+
+    def sink(self, name: Optional[str] = None) -> Sink:
+        """
+        Returns a pipeline stage publishing every batch, e.g. after Correlate and Crop.
+        """
+        return Sink(lambda batch: self.publish(batch.data, batch.seq_counter), name=name or "publish")
+
+    @property
+    def num_subscribers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the server counters.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "batches_published": self.batches_published,
+            "bytes_published": self.bytes_published,
+            "subscribers": [
+                {"peer": s.peer, "sent": s.sent, "dropped": s.dropped, "queued": s.queue.qsize()}
+                for s in subscribers
+            ],
+        }
+
+    # ------------------------------------------------------------------ connections
+
+    def _accept(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sock, peer = self._listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            sock.settimeout(None)
+            if sock.family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                sock.sendall(self._info_message)
+            except OSError:
+                sock.close()
+                continue
+            subscriber = _Subscriber(sock, peer, self.max_queue)
+            subscriber.thread = threading.Thread(target=self._send, args=(subscriber,),
+                                                 name="ilmsens-server-subscriber", daemon=True)
+            with self._lock:
+                self._subscribers.append(subscriber)
+            subscriber.thread.start()
+
+    def _send(self, subscriber: _Subscriber) -> None:
+        try:
+            closing = False
+            while not closing:
+                try:
+                    message = subscriber.queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop.is_set() and self._listener is None:
+                        break
+                    continue
+                if message is _CLOSE:
+                    break
+                parts = [message]
+                size = len(message)
+                while size < SEND_BATCH_BYTES:
+                    try:
+                        message = subscriber.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if message is _CLOSE:
+                        closing = True
+                        break
+                    parts.append(message)
+                    size += len(message)
+                subscriber.sock.sendall(parts[0] if len(parts) == 1 else b"".join(parts))
+                subscriber.sent += len(parts)
+        except OSError:
+            pass # subscriber disconnected
+        finally:
+            self._disconnect(subscriber)
+
+    def _disconnect(self, subscriber: _Subscriber) -> None:
+        with self._lock:
+            if subscriber not in self._subscribers:
+                return
+            self._subscribers.remove(subscriber)
+        try:
+            subscriber.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        subscriber.sock.close()
+
+
+
+class FrameClient:
+    """
+    Subscribes to a FrameServer.
+
+    On connect the stream description is received: dev_nums, mod_ids and mod_infos of the
+    published devices and the kind of data. Batches are then read with recv() or by iterating.
+
+    Parameters
+    ----------
+    address : tuple or str
+        (host, port) of a TCP server or the path of a Unix socket
+    decode : bool
+        convert float16 and int16 payloads to float32, see decode_batch
+    timeout : float, optional
+        socket timeout [s] for connecting and receiving
+    """
+
+    def __init__(self, address: Union[Tuple[str, int], str], decode: bool = True, timeout: Optional[float] = None):
+        self.decode = decode
+        self._sock = socket.socket(_socket_family(address), socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(address)
+            msg_type, body = self._recv_message()
+            if msg_type != MSG_INFO:
+                raise ConnectionError("stream does not start with MSG_INFO")
+        except BaseException:
+            self._sock.close()
+            raise
+        self.info = StreamInfo.from_buffer_copy(body)
+        if self.info.mVersion != PROTOCOL_VERSION:
+            self._sock.close()
+            raise ConnectionError(f"unsupported protocol version {self.info.mVersion}")
+        devices = (CaptureDevice * self.info.mNumDevices).from_buffer_copy(body, sizeof(StreamInfo))
+        self.dev_nums = [device.mDevNum for device in devices]
+        self.mod_ids = [device.mModId for device in devices]
+        self.mod_infos = [device.mInfo for device in devices]
+        self.mod_info = self.mod_infos[0] if self.mod_infos else None
+        self.kind = self.info.mKind
+
+    def _recv_message(self) -> Tuple[int, Optional[bytearray]]:
+        data = _recv_exact(self._sock, sizeof(MessageHeader))
+        if data is None:
+            return 0, None
+        header = MessageHeader.from_buffer_copy(data)
+        if header.mMagic != SERVER_MAGIC:
+            raise ConnectionError("invalid message header")
+        body = _recv_exact(self._sock, header.mLength)
+        if body is None:
+            return 0, None
+        return header.mType, body
+
+    def recv(self) -> Optional[Batch]:
+        """
+        Receives the next batch, None once the server closed the connection.
+        """
+        while True:
+            msg_type, body = self._recv_message()
+            if body is None:
+                return None
+            if msg_type == MSG_FRAMES:
+                return decode_batch(body, self.decode)
+            # unknown message types of newer servers are skipped
+
+    def __iter__(self) -> Iterator[Batch]:
+        while True:
+            batch = self.recv()
+            if batch is None:
+                return
+            yield batch
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
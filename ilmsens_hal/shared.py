@@ -0,0 +1,362 @@
+import time
+import numpy as np
+from ctypes import Structure
+from ctypes import c_char
+from ctypes import c_uint
+from ctypes import c_uint64
+from ctypes import sizeof
+from multiprocessing import shared_memory
+from typing import List, Optional
+from . import ilmsens_hal as hal
+from .buffers import attachSharedMemory
+from .capture import CaptureDevice
+from .types import ilmsens_hal_ModInfo
+from .types import ilmsens_hal_SampleType
+from .types import modInfoStruct
+from .utils import decode_frames
+
+
+RING_MAGIC = b"ILMSRNG\0"
+RING_VERSION = 1
+"""Slot data start at multiples of this size, so no two slots share a cache line"""
+SLOT_ALIGNMENT = 64
+"""The slot data region starts at a multiple of this offset"""
+RING_ALIGNMENT = 4096
+
+"""Per-slot header: seqlock stamp (2 x index + 1 while written, 2 x index + 2 once complete),
+sequence counter of the first device and UNIX time of the frame"""
+SLOT_DTYPE = np.dtype([("stamp", "<u8"), ("seq_counter", "<i8"), ("timestamp", "<f8"), ("reserved", "<u8")])
+
+
+class RingHeader(Structure):
+    _fields_ = [
+        ("mMagic", c_char * 8), # RING_MAGIC
+        ("mVersion", c_uint), # layout version
+        ("mNumDevices", c_uint), # number of CaptureDevice records following
+        ("mNumSlots", c_uint), # number of frame slots
+        ("mFrameSize", c_uint), # size of one frame of all devices [bytes]
+        ("mSlotSize", c_uint), # distance between two slots [bytes], mFrameSize rounded up to SLOT_ALIGNMENT
+        ("mSlotTable", c_uint), # offset of the SLOT_DTYPE table [bytes]
+        ("mDataOffset", c_uint), # offset of the first slot [bytes]
+        ("mReserved", c_uint),
+        ("mWriteCount", c_uint64), # number of frames written so far, updated after each frame
+    ]
+
+
+
+class _RingLayout:
+    """
+    NumPy views on the header, slot table and slot data of a ring block.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, header: RingHeader):
+        self.shm = shm
+        self.header = header
+        self.num_slots = header.mNumSlots
+        self.frame_words = header.mFrameSize // sizeof(ilmsens_hal_SampleType)
+        # np.frombuffer holds a buffer export, so the block cannot be unmapped while views exist
+        self.write_count = np.frombuffer(shm.buf, dtype="<u8", count=1, offset=RingHeader.mWriteCount.offset)
+        self.slots = np.frombuffer(shm.buf, dtype=SLOT_DTYPE, count=self.num_slots, offset=header.mSlotTable)
+        data = np.frombuffer(shm.buf, dtype=np.uint8, count=self.num_slots * header.mSlotSize, offset=header.mDataOffset)
+        data = data.reshape(self.num_slots, header.mSlotSize)
+        self.data = data[:, :header.mFrameSize].view(ilmsens_hal_SampleType) # (slots, frame words)
+
+    def release(self) -> bool:
+        """Drops the views and unmaps the block, False if frames handed out still reference it."""
+        del self.write_count, self.slots, self.data
+        try:
+            self.shm.close()
+        except BufferError:
+            return False
+        return True
+
+
+
+class SharedFrameRing:
+    """
+    Single-writer ring of measurement frames in shared memory, read by any number of processes.
+
+    The block starts with a RingHeader and one CaptureDevice record per device (device-index,
+    identifier and ModInfo), followed by a table of slot headers and num_slots fixed-size
+    slots of one frame each. Frame i goes to slot i % num_slots; its slot header is stamped
+    2i + 1 before and 2i + 2 after the data are written (a seqlock), and mWriteCount is
+    advanced last. A reader that falls more than num_slots - 1 frames behind therefore sees
+    a newer stamp and knows it was overrun, and can check after processing a zero-copy view
+    that the slot was not overwritten meanwhile. The writer never waits for readers.
+
+    With claim() and commit() measGet writes straight into the shared slot, see measure().
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        device-indexes of the group
+    num_slots : int
+        number of frames the ring holds
+    mod_infos : List[ilmsens_hal_ModInfo], optional
+        configuration of each device, the cached getModInfoSnapshot if omitted
+    mod_ids : List[bytes], optional
+        identifier of each device, queried with getModId if omitted
+    name : str, optional
+        name of the shared memory block, chosen by the system if omitted
+    """
+
+    def __init__(self, dev_nums: List[int], num_slots: int = 64, mod_infos: Optional[List[ilmsens_hal_ModInfo]] = None,
+                 mod_ids: Optional[List[bytes]] = None, name: Optional[str] = None):
+        if num_slots < 2:
+            raise ValueError("num_slots must be at least 2")
+        if mod_infos is None:
+            mod_infos = [hal.getModInfoSnapshot(dev_num) for dev_num in dev_nums]
+        if mod_ids is None:
+            mod_ids = [hal.getModId(dev_num) for dev_num in dev_nums]
+
+        self.dev_nums = list(dev_nums)
+        self.mod_infos = list(mod_infos)
+        self.mod_info = self.mod_infos[0]
+        self._seq_index = self.mod_info.mNumSamp + self.mod_info.mConfig.mOV - 1
+
+        header = RingHeader()
+        header.mMagic = RING_MAGIC
+        header.mVersion = RING_VERSION
+        header.mNumDevices = len(self.dev_nums)
+        header.mNumSlots = num_slots
+        header.mFrameSize = sum(hal.deviceFrameSize(info) for info in self.mod_infos)
+        header.mSlotSize = -(-header.mFrameSize // SLOT_ALIGNMENT) * SLOT_ALIGNMENT
+        devices = (CaptureDevice * len(self.dev_nums))()
+        for device, dev_num, info, mod_id in zip(devices, self.dev_nums, self.mod_infos, mod_ids):
+            device.mDevNum = dev_num
+            device.mModId = mod_id
+            device.mInfo = modInfoStruct(info)
+        header.mSlotTable = -(-(sizeof(header) + sizeof(devices)) // SLOT_ALIGNMENT) * SLOT_ALIGNMENT
+        table_end = header.mSlotTable + num_slots * SLOT_DTYPE.itemsize
+        header.mDataOffset = -(-table_end // RING_ALIGNMENT) * RING_ALIGNMENT
+        self.frame_size = header.mFrameSize
+
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=header.mDataOffset + num_slots * header.mSlotSize)
+        self._shm.buf[:sizeof(header)] = bytes(header)
+        self._shm.buf[sizeof(header):sizeof(header) + sizeof(devices)] = bytes(devices)
+        self._layout = _RingLayout(self._shm, header)
+        self._layout.slots[:] = 0
+        self._layout.write_count[0] = 0
+        self.num_slots = num_slots
+        self.frames_written = 0
+        self._claimed = False
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the shared memory block, passed to SharedFrameReader.
+        """
+        return self._shm.name
+
+    def claim(self) -> np.ndarray:
+        """
+        Marks the next slot as being written and returns it as a writable int32 view,
+        e.g. as buffer of measGet. The frame becomes visible to readers with commit().
+        """
+        layout = self._layout
+        slot = self.frames_written % self.num_slots
+        layout.slots["stamp"][slot] = 2 * self.frames_written + 1
+        self._claimed = True
+        return layout.data[slot]
+
+    def commit(self, timestamp: Optional[float] = None) -> None:
+        """
+        Publishes the frame written into the claimed slot.
+        """
+        if not self._claimed:
+            raise RuntimeError("no slot claimed")
+        layout = self._layout
+        index = self.frames_written
+        slot = index % self.num_slots
+        layout.slots["seq_counter"][slot] = layout.data[slot, self._seq_index]
+        layout.slots["timestamp"][slot] = time.time() if timestamp is None else timestamp
+        layout.slots["stamp"][slot] = 2 * index + 2
+        self.frames_written = index + 1
+        self._claimed = False
+        layout.write_count[0] = self.frames_written
+
+    def abort(self) -> None:
+        """
+        Gives up the claimed slot, e.g. after a failed measGet; readers skip it.
+        """
+        self._claimed = False
+
+    def write(self, buffer, num_frames: int = 1, timestamp: Optional[float] = None) -> None:
+        """
+        Copies num_frames complete frames from buffer (bytes-like, e.g. the result of measGet) into the ring.
+        """
+        words = np.frombuffer(buffer, dtype=ilmsens_hal_SampleType, count=num_frames * self._layout.frame_words)
+        for frame in words.reshape(num_frames, -1):
+            self.claim()[:] = frame
+            self.commit(timestamp)
+
+    def measure(self, timeout_millis: int = 500) -> int:
+        """
+        Reads the next measurement of the group with measGet directly into the ring.
+
+        Returns
+        -------
+        int
+            the number of elements read or a negative error-code; nothing is published on errors
+        """
+        _, num_elements = hal.measGet(self.dev_nums, timeout_millis=timeout_millis, buffer=self.claim())
+        if num_elements > 0:
+            self.commit()
+        else:
+            self.abort()
+        return num_elements
+
+    def close(self, unlink: bool = True) -> None:
+        """
+        Unmaps the ring and, unless unlink is False, removes it; attached readers keep their mapping.
+        """
+        if self._layout is None:
+            return
+        self._layout.release()
+        self._layout = None
+        if unlink:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+class SharedFrame:
+    """
+    A frame read from a SharedFrameRing, as zero-copy views of its slot.
+
+    The views alias shared memory the writer reuses once it has written num_slots further
+    frames; check valid after processing them (or copy what must outlive the slot).
+    """
+    __slots__ = ("index", "data", "samples", "seq_counter", "timestamp", "_stamps", "_stamp")
+
+    def __init__(self, index: int, data: np.ndarray, samples: np.ndarray, seq_counter: np.ndarray,
+                 timestamp: float, stamps: np.ndarray, stamp: int):
+        self.index = index
+        self.data = data
+        self.samples = samples
+        self.seq_counter = seq_counter
+        self.timestamp = timestamp
+        self._stamps = stamps # stamp field of the slot table
+        self._stamp = stamp
+
+    @property
+    def valid(self) -> bool:
+        """
+        True while the slot still holds this frame.
+        """
+        return int(self._stamps[self.index % len(self._stamps)]) == self._stamp
+
+
+
+class SharedFrameReader:
+    """
+    Attaches to a SharedFrameRing by name and follows the frames written to it.
+
+    Parameters
+    ----------
+    name : str
+        name of the ring's shared memory block
+    start : str
+        "latest" to begin with the next frame written, "oldest" with the oldest frame still in the ring
+    poll_interval : float
+        sleep [s] between checks for a new frame in read()
+    """
+
+    def __init__(self, name: str, start: str = "latest", poll_interval: float = 0.0005):
+        if start not in ("latest", "oldest"):
+            raise ValueError(f"unknown start '{start}'")
+        self._shm = attachSharedMemory(name)
+        header = RingHeader.from_buffer_copy(self._shm.buf)
+        if header.mMagic != RING_MAGIC.rstrip(b"\0") or header.mVersion != RING_VERSION:
+            self._shm.close()
+            raise ValueError(f"'{name}' is not a frame ring of version {RING_VERSION}")
+        devices = (CaptureDevice * header.mNumDevices).from_buffer_copy(self._shm.buf, sizeof(RingHeader))
+        self.dev_nums = [device.mDevNum for device in devices]
+        self.mod_ids = [device.mModId for device in devices]
+        self.mod_infos = [device.mInfo for device in devices]
+        self.mod_info = self.mod_infos[0]
+        self.num_slots = header.mNumSlots
+        self.frame_size = header.mFrameSize
+        self.poll_interval = poll_interval
+        self._layout = _RingLayout(self._shm, header)
+
+        count = int(self._layout.write_count[0])
+        self.next_index = count if start == "latest" else max(0, count - self.num_slots + 1)
+        self.frames_read = 0
+        self.overruns = 0 # frames overwritten before this reader got to them
+
+    def _frame(self, index: int) -> Optional[SharedFrame]:
+        layout = self._layout
+        slot = index % self.num_slots
+        stamps = layout.slots["stamp"]
+        stamp = 2 * index + 2
+        if int(stamps[slot]) != stamp:
+            return None
+        timestamp = float(layout.slots["timestamp"][slot])
+        if int(stamps[slot]) != stamp:
+            return None
+        data = layout.data[slot]
+        samples, seq_counter = decode_frames(data, self.mod_info, num_devices=len(self.dev_nums))
+        return SharedFrame(index, data, samples[0], seq_counter[0], timestamp, stamps, stamp)
+
+    def available(self) -> int:
+        """
+        Number of frames written but not yet read (may exceed the ring size after an overrun).
+        """
+        return int(self._layout.write_count[0]) - self.next_index
+
+    def read(self, timeout: Optional[float] = None) -> Optional[SharedFrame]:
+        """
+        Returns the next frame, or None if none was written within timeout seconds (None waits forever).
+
+        Frames the writer overwrote before they were read are skipped and counted in overruns.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            count = int(self._layout.write_count[0])
+            if self.next_index < count:
+                oldest = count - self.num_slots + 1 # the slot of frame count - num_slots may be in writing
+                if self.next_index < oldest:
+                    self.overruns += oldest - self.next_index
+                    self.next_index = oldest
+                frame = self._frame(self.next_index)
+                if frame is not None:
+                    self.next_index += 1
+                    self.frames_read += 1
+                    return frame
+                continue # overwritten while reading it, catch up
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def __iter__(self):
+        while True:
+            yield self.read()
+
+    def stats(self) -> dict:
+        return {
+            "frames_read": self.frames_read,
+            "overruns": self.overruns,
+            "next_index": self.next_index,
+            "available": self.available(),
+        }
+
+    def close(self) -> None:
+        """
+        Detaches from the ring; while SharedFrame views are still referenced the block stays mapped until they are released.
+        """
+        if self._layout is None:
+            return
+        self._layout.release()
+        self._layout = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
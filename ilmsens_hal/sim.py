@@ -0,0 +1,402 @@
+import random
+import threading
+import time
+import numpy as np
+from ctypes import memmove
+from ctypes import sizeof
+from typing import Dict, List, Optional
+from .error import ILMSENS_SUCCESS
+from .error import ILMSENS_ERROR_INVALID_PARAM
+from .error import ILMSENS_ERROR_STATE
+from .error import ILMSENS_ERROR_AGAIN
+from .error import ILMSENS_ERROR_TIMEOUT
+from .types import ilmsens_hal_SampleType
+from .types import ilmsens_hal_MemoryType
+from .types import unwrapRef
+from .types import unwrapValue
+
+
+_INT32 = np.iinfo(np.int32)
+
+"""Number of words of simulated device memory (readBlk/writeBlk) per device"""
+SIM_MEMORY_WORDS = 1 << 16
+
+
+
+class _SimDevice:
+    def __init__(self, dev_num: int):
+        self.dev_num = dev_num
+        self.order = 9
+        self.sub = 128
+        self.clk = 13.312
+        self.ov = 1
+        self.tx = 1
+        self.rx = 2
+        self.hw_avg = 256
+        self.avg = 1
+        self.wait = 0
+        self.master = True
+        self.tx_on = False
+        self.memory = np.zeros(SIM_MEMORY_WORDS, dtype=np.uint32)
+        self.registers: Dict[int, int] = {}
+
+    @property
+    def num_samples(self) -> int:
+        return (2**self.order - 1) * self.ov
+
+    @property
+    def channel_words(self) -> int:
+        return 2**self.order * self.ov
+
+
+
+class SimulatedHAL:
+    """
+    Hardware-free stand-in for libilmsens_hal.so.
+
+    Implements the ilmsens_hal_* entry points with the same arguments the wrappers pass to
+    the shared library, so it can be installed with useBackend() and everything built on the
+    wrappers runs unchanged. Measured data are MLBS responses of a few synthetic reflections
+    plus noise, in the HAL buffer layout including sequence counter and status words.
+
+    Parameters
+    ----------
+    num_devices : int
+        number of simulated connected sensors
+    frame_rate : float
+        measurements per second produced by a running device group
+    buffer_frames : int
+        capacity of the simulated HAL ring buffer; older frames are lost on overflow
+    latency : float
+        extra delay [s] added to every measGet/measRead call
+    error_rate : float
+        probability that a measGet/measRead call fails with error_code
+    error_code : int
+        error returned on injected failures (e.g. ILMSENS_ERROR_AGAIN or ILMSENS_ERROR_TIMEOUT)
+    drop_rate : float
+        probability that a measurement is lost, leaving a gap in the sequence counter
+    noise : float
+        standard deviation of the additive noise in ADC LSB
+    seed : int, optional
+        seed for reproducible noise, errors and drops
+    """
+
+    def __init__(self, num_devices: int = 1, frame_rate: float = 1000.0, buffer_frames: int = 64,
+                 latency: float = 0.0, error_rate: float = 0.0, error_code: int = ILMSENS_ERROR_AGAIN.value,
+                 drop_rate: float = 0.0, noise: float = 4.0, seed: Optional[int] = None):
+        self.num_devices = num_devices
+        self.frame_rate = frame_rate
+        self.buffer_frames = buffer_frames
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.drop_rate = drop_rate
+        self.noise = noise
+        self.deb_level = 0
+
+        self._random = random.Random(seed)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._devices: Dict[int, _SimDevice] = {}
+        self._opened = set()
+        self._runs: Dict[tuple, dict] = {}
+        self._frames: Dict[tuple, np.ndarray] = {}
+
+    # ------------------------------------------------------------------ helpers
+
+    def _group(self, dev_nums, num) -> List[int]:
+        return [int(dev_nums[i]) for i in range(unwrapValue(num))]
+
+    def _valid(self, group: List[int], opened: bool = True) -> bool:
+        if not self._initialized or not group:
+            return False
+        for dev_num in group:
+            if dev_num not in self._devices or (opened and dev_num not in self._opened):
+                return False
+        return True
+
+    def _device_frames(self, device: _SimDevice) -> np.ndarray:
+        """Noisy raw frames of one device, shape (variants, rx, channel_words), int32."""
+        key = (device.dev_num, device.order, device.clk, device.ov, device.rx, device.hw_avg, device.avg)
+        frames = self._frames.get(key)
+        if frames is None:
+            from .utils import read_dependencies
+            ref = read_dependencies(device.order, device.clk, device.ov)["mDR_Ref_MLBS"]
+            num_samples = len(ref)
+            frames = np.zeros((8, device.rx, device.channel_words), dtype=np.int32)
+            accumulations = device.hw_avg * device.avg
+            for rx in range(device.rx):
+                response = np.zeros(num_samples)
+                for k, delay in enumerate((8, 40 + 16 * rx, 150 + 32 * rx)):
+                    response[delay % num_samples] = 0.5 ** k
+                signal = np.fft.irfft(np.fft.rfft(ref) * np.fft.rfft(response), n=num_samples)
+                # the accumulated peak stays within half the int32 range even for the largest averages
+                signal *= min(2000.0, 0.5 * _INT32.max / accumulations) / np.abs(signal).max()
+                for v in range(frames.shape[0]):
+                    noisy = signal + self._rng.normal(0.0, self.noise, num_samples)
+                    # noise beyond the headroom saturates like an accumulator instead of wrapping
+                    accumulated = np.clip(np.round(noisy * accumulations), _INT32.min, _INT32.max)
+                    frames[v, rx, :num_samples] = accumulated.astype(np.int32)
+            self._frames[key] = frames
+        return frames
+
+    def _available(self, run: dict, now: float) -> int:
+        produced = int((now - run["start"]) * self.frame_rate)
+        available = produced - run["consumed"]
+        if available > self.buffer_frames:
+            # HAL ring buffer overflow: the oldest measurements are lost
+            run["consumed"] += available - self.buffer_frames
+            available = self.buffer_frames
+        return available
+
+    def _read(self, dev_nums, num, buffer, size, timeout: Optional[float]) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        group = self._group(dev_nums, num)
+        if not self._valid(group):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        devices = [self._devices[dev_num] for dev_num in group]
+        num_words = sum(device.rx * device.channel_words for device in devices)
+        if unwrapValue(size) < num_words * sizeof(ilmsens_hal_SampleType):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self.error_code
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                run = self._runs.get(tuple(group))
+                if run is None:
+                    return ILMSENS_ERROR_STATE.value
+                now = time.monotonic()
+                if self._available(run, now) > 0:
+                    index = run["consumed"]
+                    run["consumed"] += 1
+                    if self.drop_rate and self._random.random() < self.drop_rate:
+                        run["consumed"] += 1 # the following measurement is lost
+                    break
+                next_frame = run["start"] + (run["consumed"] + 1) / self.frame_rate
+            if deadline is None:
+                return ILMSENS_ERROR_AGAIN.value
+            if now >= deadline:
+                return ILMSENS_ERROR_TIMEOUT.value
+            time.sleep(max(0.0, min(next_frame, deadline) - now))
+
+        # written straight into the caller's buffer, so the simulator allocates nothing per frame
+        # that a benchmark of the wrappers would attribute to them
+        try:
+            data = np.frombuffer(unwrapRef(buffer), dtype=np.int32, count=num_words)
+        except (TypeError, ValueError):
+            data = None # a raw pointer, copied below
+        target = data if data is not None else np.empty(num_words, dtype=np.int32)
+        offset = 0
+        for device in devices:
+            frames = self._device_frames(device)
+            frame = frames[index % len(frames)]
+            words = frame.size
+            target[offset:offset+words] = frame.reshape(-1)
+            target[offset + device.channel_words - 1] = index # sequence counter
+            offset += words
+        if data is None:
+            memmove(unwrapRef(buffer), target.ctypes.data, target.nbytes)
+        return num_words
+
+    # ------------------------------------------------------------------ library
+
+    def ilmsens_hal_getVersion(self, version) -> int:
+        version = unwrapRef(version)
+        version.mMajor, version.mMinor, version.mBuild = 1, 1, 1
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_setDEBLevel(self, level) -> int:
+        self.deb_level = unwrapValue(level)
+        return self.deb_level
+
+    def ilmsens_hal_initHAL(self) -> int:
+        self._initialized = True
+        for dev_num in range(1, self.num_devices + 1):
+            self._devices.setdefault(dev_num, _SimDevice(dev_num))
+        return self.num_devices
+
+    def ilmsens_hal_deinitHAL(self) -> None:
+        self._initialized = False
+        self._opened.clear()
+        self._runs.clear()
+
+    # ------------------------------------------------------------------ devices
+
+    def ilmsens_hal_openSensors(self, dev_nums, num) -> int:
+        group = self._group(dev_nums, num)
+        if not self._valid(group, opened=False):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        self._opened.update(group)
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_closeSensors(self, dev_nums, num) -> None:
+        for dev_num in self._group(dev_nums, num):
+            self._opened.discard(dev_num)
+            for group in [g for g in self._runs if dev_num in g]:
+                del self._runs[group]
+
+    def ilmsens_hal_getModId(self, dev_num, buffer, size) -> int:
+        dev_num = unwrapValue(dev_num)
+        if not self._valid([dev_num], opened=False):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        mod_id = f"SIM-M{self._devices[dev_num].order}-{dev_num:04d}".encode()[:unwrapValue(size) - 1]
+        memmove(unwrapRef(buffer), mod_id + b"\0", len(mod_id) + 1)
+        return len(mod_id)
+
+    def ilmsens_hal_getModInfo(self, dev_num, info) -> int:
+        dev_num = unwrapValue(dev_num)
+        if not self._valid([dev_num], opened=False):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        device = self._devices[dev_num]
+        info = unwrapRef(info)
+        info.mConfig.mOrder = device.order
+        info.mConfig.mSub = device.sub
+        info.mConfig.mClk = device.clk
+        info.mConfig.mOV = device.ov
+        info.mConfig.mTx = device.tx
+        info.mConfig.mRx = device.rx
+        info.mTB_Fc = 0.0
+        info.mTemp = 42.0
+        info.mLSB_Volt = 1.0 / 2**15
+        info.mFSR[0], info.mFSR[1] = -1.0, 1.0
+        info.mHWAvg = device.hw_avg
+        info.mAvg = device.avg
+        info.mAvgLim[0], info.mAvgLim[1] = 1, 65535
+        info.mWait = device.wait
+        info.mWaitLim[0], info.mWaitLim[1] = 0, 65535
+        info.mNumSamp = device.num_samples
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_setupSensors(self, dev_nums, num, mod_config) -> int:
+        group = self._group(dev_nums, num)
+        mod_config = unwrapRef(mod_config)
+        if not self._valid(group) or mod_config.mOrder not in (9, 12, 15):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        for dev_num in group:
+            device = self._devices[dev_num]
+            device.order = mod_config.mOrder
+            device.clk = mod_config.mClk or device.clk
+            device.sub = mod_config.mSub or device.sub
+            device.ov = mod_config.mOV or 1
+            device.tx = mod_config.mTx or device.tx
+            device.rx = mod_config.mRx or device.rx
+            device.avg = 1
+            device.wait = 0
+        return ILMSENS_SUCCESS.value
+
+    def _set_all(self, dev_nums, num, **values) -> int:
+        group = self._group(dev_nums, num)
+        if not self._valid(group):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        if any(dev_num in g for g in self._runs for dev_num in group):
+            return ILMSENS_ERROR_STATE.value
+        for dev_num in group:
+            for name, value in values.items():
+                setattr(self._devices[dev_num], name, value)
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_setMaster(self, dev_nums, num, mode) -> int:
+        return self._set_all(dev_nums, num, master=bool(unwrapValue(mode)))
+
+    def ilmsens_hal_setAvg(self, dev_nums, num, avg, wait_cyc) -> int:
+        avg = unwrapValue(avg)
+        if not 1 <= avg <= 65535:
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        return self._set_all(dev_nums, num, avg=avg, wait=unwrapValue(wait_cyc))
+
+    def ilmsens_hal_setMLBS(self, dev_nums, num) -> int:
+        return self._set_all(dev_nums, num)
+
+    def ilmsens_hal_setPD(self, dev_nums, num, mode) -> int:
+        return self._set_all(dev_nums, num, tx_on=not unwrapValue(mode))
+
+    def ilmsens_hal_synchMS(self, dev_nums, num, mode) -> int:
+        return self._set_all(dev_nums, num)
+
+    def ilmsens_hal_xt_internal_setDel(self, dev_nums, num, delay) -> int:
+        return self._set_all(dev_nums, num)
+
+    # ------------------------------------------------------------------ measurement
+
+    def ilmsens_hal_measRun(self, dev_nums, num, mode) -> int:
+        group = tuple(self._group(dev_nums, num))
+        if not self._valid(list(group)):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        with self._lock:
+            if any(dev_num in g for g in self._runs for dev_num in group):
+                return ILMSENS_ERROR_STATE.value
+            self._runs[group] = {"start": time.monotonic(), "consumed": 0, "mode": unwrapValue(mode)}
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_measStop(self, dev_nums, num) -> int:
+        group = tuple(self._group(dev_nums, num))
+        with self._lock:
+            if self._runs.pop(group, None) is None:
+                return ILMSENS_ERROR_STATE.value
+        return ILMSENS_SUCCESS.value
+
+    def ilmsens_hal_measRdy(self, dev_nums, num) -> int:
+        group = tuple(self._group(dev_nums, num))
+        with self._lock:
+            run = self._runs.get(group)
+            if run is None:
+                return ILMSENS_ERROR_STATE.value
+            return self._available(run, time.monotonic())
+
+    def ilmsens_hal_measRead(self, dev_nums, num, buffer, size) -> int:
+        return self._read(dev_nums, num, buffer, size, None)
+
+    def ilmsens_hal_measGet(self, dev_nums, num, buffer, size, timeout_millis) -> int:
+        timeout_millis = unwrapValue(timeout_millis)
+        return self._read(dev_nums, num, buffer, size, timeout_millis / 1000.0 if timeout_millis else float("inf"))
+
+    # ------------------------------------------------------------------ registers & memory
+
+    def ilmsens_hal_readReg(self, dev_nums, num, reg, buffer, size) -> int:
+        group = self._group(dev_nums, num)
+        if not self._valid(group) or unwrapValue(size) < len(group) * sizeof(ilmsens_hal_MemoryType):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        values = np.array([self._devices[d].registers.get(unwrapValue(reg), 0) for d in group], dtype=np.uint32)
+        memmove(unwrapRef(buffer), values.ctypes.data, values.nbytes)
+        return len(group)
+
+    def ilmsens_hal_writeReg(self, dev_nums, num, reg, value) -> int:
+        group = self._group(dev_nums, num)
+        if not self._valid(group):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        for dev_num in group:
+            self._devices[dev_num].registers[unwrapValue(reg)] = unwrapValue(value)
+        return ILMSENS_SUCCESS.value
+
+    @staticmethod
+    def _word_address(adr) -> Optional[int]:
+        """Word index of a word-aligned byte address, None if unaligned."""
+        adr = unwrapValue(adr)
+        s = sizeof(ilmsens_hal_MemoryType)
+        return adr // s if adr % s == 0 else None
+
+    def ilmsens_hal_readBlk(self, dev_nums, num, adr, num_el, buffer, size) -> int:
+        group = self._group(dev_nums, num)
+        adr, num_el = self._word_address(adr), unwrapValue(num_el)
+        if (not self._valid(group) or adr is None or adr + num_el > SIM_MEMORY_WORDS
+                or unwrapValue(size) < len(group) * num_el * sizeof(ilmsens_hal_MemoryType)):
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        values = np.concatenate([self._devices[d].memory[adr:adr+num_el] for d in group])
+        memmove(unwrapRef(buffer), values.ctypes.data, values.nbytes)
+        return values.size
+
+    def ilmsens_hal_writeBlk(self, dev_nums, num, adr, num_el, buffer, size) -> int:
+        group = self._group(dev_nums, num)
+        adr, num_el = self._word_address(adr), unwrapValue(num_el)
+        nbytes = num_el * sizeof(ilmsens_hal_MemoryType)
+        if not self._valid(group) or adr is None or adr + num_el > SIM_MEMORY_WORDS or unwrapValue(size) < nbytes:
+            return ILMSENS_ERROR_INVALID_PARAM.value
+        values = np.empty(num_el, dtype=np.uint32)
+        memmove(values.ctypes.data, unwrapRef(buffer), nbytes)
+        for dev_num in group:
+            self._devices[dev_num].memory[adr:adr+num_el] = values
+        return ILMSENS_SUCCESS.value
@@ -0,0 +1,295 @@
+import queue
+import struct
+import threading
+import time
+from ctypes import sizeof
+from typing import Callable, List, Optional
+from . import ilmsens_hal as hal
+from .buffers import BufferRing
+from .defn import meas_run
+from .error import ILMSENS_ERROR_AGAIN
+from .error import ILMSENS_ERROR_TIMEOUT
+from .monitor import FillLevel
+from .monitor import LatencyHistogram
+from .monitor import SequenceTracker
+from .types import ilmsens_hal_ModInfo
+from .types import ilmsens_hal_SampleType
+
+
+"""Overflow policy: discard the oldest queued frame to make room for a new one"""
+DROP_OLDEST = "drop_oldest"
+"""Overflow policy: stop draining the device until the consumer releases a frame"""
+BLOCK = "block"
+
+
+
+class StreamFrame:
+    """
+    One measurement (all devices of the group) held in a slot of the acquisition ring.
+    The buffer stays valid until the frame is released.
+    """
+    __slots__ = ("slot", "buffer", "num_elements", "seq_counter", "timestamp")
+
+    def __init__(self, slot: int, buffer, num_elements: int, seq_counter: List[int], timestamp: float):
+        self.slot = slot
+        self.buffer = buffer
+        self.num_elements = num_elements
+        self.seq_counter = seq_counter
+        self.timestamp = timestamp
+
+
+
+class StreamingAcquisition:
+    """
+    Drains a running measurement on a dedicated thread into a bounded ring of preallocated frames.
+
+    The producer thread starts the devices in ILMSENS_HAL_RUN_BUF mode and calls measGet in a
+    loop, writing directly into free ring slots. ctypes releases the GIL for the duration of the
+    C call, so the consumer keeps running while the thread waits for data. When every slot is in
+    use, the policy decides what happens: DROP_OLDEST discards the oldest frame not yet handed to
+    the consumer, BLOCK stops calling measGet until a slot is released (the HAL ring buffer then
+    absorbs the stall).
+
+    An exception raised on the producer thread ends it; get() re-raises it once the frames
+    queued before have been taken, and so does stop().
+
+    The sequence counters of every frame feed a SequenceTracker (lost, duplicated and
+    out-of-order frames per device), each measGet call is timed into a LatencyHistogram and,
+    unless disabled, the HAL fill level is sampled with measRdy before each read.
+
+    Parameters
+    ----------
+    dev_nums : List[int]
+        an array of device-indexes
+    mod_info : ilmsens_hal_ModInfo
+        configuration of the devices, used to size the frames and locate the sequence counter
+    num_buffers : int
+        number of slots in the ring (the queue bound)
+    policy : str
+        DROP_OLDEST or BLOCK
+    timeout_millis : int
+        measGet timeout, bounds how long stop() waits for the thread
+    factory : Callable[[int], object], optional
+        buffer factory passed to BufferRing, e.g. for NumPy-backed slots
+    monitor_fill : bool
+        sample the measRdy fill level before each measGet
+    """
+
+    def __init__(self, dev_nums: List[int], mod_info: ilmsens_hal_ModInfo, num_buffers: int = 16,
+                 policy: str = DROP_OLDEST, timeout_millis: int = 100, factory: Optional[Callable[[int], object]] = None,
+                 monitor_fill: bool = True):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"unknown policy '{policy}'")
+        if num_buffers < 2:
+            raise ValueError("num_buffers must be at least 2")
+
+        self.dev_nums = list(dev_nums)
+        self.policy = policy
+        self.timeout_millis = timeout_millis
+        self.monitor_fill = monitor_fill
+
+        s = sizeof(ilmsens_hal_SampleType)
+        self._device_bytes = hal.deviceFrameSize(mod_info)
+        self._seq_offset = (mod_info.mNumSamp + mod_info.mConfig.mOV - 1) * s
+        self.buf_size_bytes = self._device_bytes * len(self.dev_nums)
+        self._ring = BufferRing(num_buffers, self.buf_size_bytes, factory)
+
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._failure: Optional[BaseException] = None
+
+        self.sequence = SequenceTracker(len(self.dev_nums))
+        self.latency = LatencyHistogram()
+        self.fill_level = FillLevel()
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.last_error = 0
+
+    # ------------------------------------------------------------------ control
+
+    def start(self, run: bool = True) -> None:
+        """
+        Starts the producer thread, and the measurement run unless run is False.
+        """
+        if self._thread is not None:
+            raise RuntimeError("acquisition already started")
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        self.sequence.reset()
+        for slot in range(len(self._ring)):
+            self._free.put(slot)
+        self._stop.clear()
+        self._failure = None
+        if run:
+            res = hal.measRun(self.dev_nums, meas_run.ILMSENS_HAL_RUN_BUF)
+            if res < 0:
+                raise RuntimeError(f"measRun failed with error {res}")
+        self._thread = threading.Thread(target=self._run, name="ilmsens-acquisition", daemon=True)
+        self._thread.start()
+
+    def stop(self, run: bool = True) -> None:
+        """
+        Stops the producer thread, and the measurement run unless run is False.
+        Frames still queued stay available to get(). Re-raises the exception that ended the
+        producer thread, if any.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if run:
+            hal.measStop(self.dev_nums)
+        failure, self._failure = self._failure, None
+        if failure is not None:
+            raise failure
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ------------------------------------------------------------------ consumer
+
+    def get(self, timeout: Optional[float] = None) -> Optional[StreamFrame]:
+        """
+        Returns the oldest queued frame, or None if none arrived within timeout seconds.
+        The frame must be passed to release() once it has been processed.
+        Raises the exception that ended the producer thread once no frame is left.
+        """
+        if self._failure is not None and self._filled.empty():
+            raise self._failure
+        try:
+            frame = self._filled.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if frame is None:
+            raise self._failure # queued by the failing producer thread to wake the consumer
+        return frame
+
+    def release(self, frame: StreamFrame) -> None:
+        """
+        Returns the slot of a processed frame to the ring.
+        """
+        self._free.put(frame.slot)
+
+    def __iter__(self):
+        """
+        Yields frames until the acquisition is stopped; each frame is released when the next one is requested.
+        """
+        while True:
+            frame = self.get(timeout=self.timeout_millis / 1000.0)
+            if frame is None:
+                if not self.running:
+                    return
+                continue
+            try:
+                yield frame
+            finally:
+                self.release(frame)
+
+    @property
+    def seq_gaps(self) -> int:
+        """
+        Total number of frames lost according to the sequence counters.
+        """
+        return int(self.sequence.lost.sum())
+
+    def qsize(self) -> int:
+        """
+        Number of frames waiting for the consumer.
+        """
+        return self._filled.qsize()
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the acquisition counters.
+        """
+        return {
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+            "seq_gaps": self.seq_gaps,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "queued": self.qsize(),
+            "sequence": self.sequence.stats(),
+            "latency": self.latency.stats(),
+            "fill_level": self.fill_level.stats(),
+        }
+
+    # ------------------------------------------------------------------ producer
+
+    def _acquire_slot(self) -> Optional[int]:
+        while not self._stop.is_set():
+            try:
+                return self._free.get_nowait()
+            except queue.Empty:
+                pass
+            if self.policy == DROP_OLDEST:
+                try:
+                    frame = self._filled.get_nowait()
+                    self.frames_dropped += 1
+                    return frame.slot
+                except queue.Empty:
+                    pass # all slots are held by the consumer
+            try:
+                return self._free.get(timeout=self.timeout_millis / 1000.0)
+            except queue.Empty:
+                pass
+        return None
+
+    def _read_seq_counters(self, buffer) -> List[int]:
+        seq_counter = [struct.unpack_from("<i", buffer, i * self._device_bytes + self._seq_offset)[0]
+                       for i in range(len(self.dev_nums))]
+        self.sequence.update(seq_counter)
+        return seq_counter
+
+    def _run(self) -> None:
+        try:
+            self._produce()
+        except Exception as error:
+            self._failure = error
+            self._stop.set()
+            self._filled.put(None)
+
+    def _produce(self) -> None:
+        while not self._stop.is_set():
+            slot = self._acquire_slot()
+            if slot is None:
+                break
+            buffer = self._ring[slot]
+            if self.monitor_fill:
+                self.fill_level.record(hal.measRdy(self.dev_nums))
+            start = time.perf_counter_ns()
+            _, num_elements = hal.measGet(
+                self.dev_nums,
+                buf_size_bytes=self.buf_size_bytes,
+                timeout_millis=self.timeout_millis,
+                buffer=self._ring.c_buffer(slot)
+            )
+            self.latency.record(time.perf_counter_ns() - start)
+            if num_elements <= 0:
+                self._free.put(slot)
+                if num_elements in (0, ILMSENS_ERROR_TIMEOUT.value, ILMSENS_ERROR_AGAIN.value):
+                    self.timeouts += 1
+                else:
+                    self.errors += 1
+                    self.last_error = num_elements
+                    time.sleep(self.timeout_millis / 1000.0)
+                continue
+
+            seq_counter = self._read_seq_counters(buffer)
+            self.frames_received += 1
+            self._filled.put(StreamFrame(slot, buffer, num_elements, seq_counter, time.monotonic()))
+
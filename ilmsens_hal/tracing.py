@@ -0,0 +1,182 @@
+import json
+import time
+from typing import Dict, List, Optional, Sequence
+from . import error
+from . import ilmsens_hal as hal
+from .monitor import LATENCY_BOUNDS_US
+from .monitor import LatencyHistogram
+
+
+"""Result classes of a traced call besides the ilmsens_hal.error codes"""
+RESULT_POSITIVE = "positive" # counts, sizes, number of datasets
+RESULT_VOID = "void" # entry points without return value
+RESULT_OTHER = "other" # negative value that is no known error code
+RESULT_EXCEPTION = "exception" # the call raised, e.g. a ctypes argument error
+
+_ERROR_NAMES = {
+    code.value: name for name, code in vars(error).items()
+    if name.startswith("ILMSENS_") and hasattr(code, "value")
+}
+RESULTS = list(_ERROR_NAMES.values()) + [RESULT_POSITIVE, RESULT_VOID, RESULT_OTHER, RESULT_EXCEPTION]
+_RESULT_INDEX = {name: i for i, name in enumerate(RESULTS)}
+
+
+
+def _result_index(res) -> int:
+    if res is None:
+        return _RESULT_INDEX[RESULT_VOID]
+    if res > 0:
+        return _RESULT_INDEX[RESULT_POSITIVE]
+    name = _ERROR_NAMES.get(res)
+    return _RESULT_INDEX[name] if name is not None else _RESULT_INDEX[RESULT_OTHER]
+
+
+
+class _CallStats:
+    __slots__ = ("count", "results", "latency")
+
+    def __init__(self, bounds_us: Sequence[float]):
+        self.count = 0
+        self.results = [0] * len(RESULTS)
+        self.latency = LatencyHistogram(bounds_us)
+
+
+
+class TracingHAL:
+    """
+    Proxy backend recording every HAL call.
+
+    Wraps another backend (the loaded library, a simulator, ...) and counts the calls,
+    their results (mapped to the ilmsens_hal.error constants) and their perf_counter_ns
+    latency per entry point into fixed-size histograms. The traced entry points are created
+    on first use and cached on the instance, so a call costs two clock reads and a few list
+    updates on top of the wrapped call. Tracing costs nothing once the proxy is removed
+    again (see disable()). Counters are not locked and may miss increments of calls made
+    concurrently from several threads.
+
+    Parameters
+    ----------
+    backend : object, optional
+        the backend to trace, defaults to the current one
+    bounds_us : Sequence[float]
+        upper bin edges of the latency histograms [us]
+    """
+
+    def __init__(self, backend: Optional[object] = None, bounds_us: Sequence[float] = LATENCY_BOUNDS_US):
+        self.backend = backend if backend is not None else hal.getBackend()
+        self.bounds_us = list(bounds_us)
+        self.stats: Dict[str, _CallStats] = {}
+
+    def __getattr__(self, name: str):
+        if not name.startswith("ilmsens_hal_"):
+            raise AttributeError(name)
+        func = getattr(self.backend, name)
+        stats = self.stats.setdefault(name[len("ilmsens_hal_"):], _CallStats(self.bounds_us))
+        results = stats.results
+        latency = stats.latency
+        perf_counter_ns = time.perf_counter_ns
+
+        def traced(*args):
+            start = perf_counter_ns()
+            index = _RESULT_INDEX[RESULT_EXCEPTION]
+            try:
+                res = func(*args)
+                index = _result_index(res)
+                return res
+            finally:
+                latency.record(perf_counter_ns() - start)
+                stats.count += 1
+                results[index] += 1
+
+        self.__dict__[name] = traced
+        return traced
+
+    def reset(self) -> None:
+        """
+        Clears all counters and histograms.
+        """
+        for stats in self.stats.values():
+            stats.count = 0
+            stats.results[:] = [0] * len(RESULTS) # in place, the traced entry points hold the list
+            stats.latency.reset()
+
+    def snapshot(self) -> dict:
+        """
+        Returns the counters of all entry points called so far.
+
+        Returns
+        -------
+        dict
+            per function name (without the ilmsens_hal_ prefix): calls, non-zero result counts
+            and the latency statistics of LatencyHistogram.stats()
+        """
+        return {
+            name: {
+                "calls": stats.count,
+                "results": {result: n for result, n in zip(RESULTS, stats.results) if n},
+                "latency": stats.latency.stats(),
+            }
+            for name, stats in self.stats.items()
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "ilmsens_hal") -> str:
+        """
+        Renders the counters in the Prometheus text exposition format.
+        """
+        lines: List[str] = [
+            f"# HELP {prefix}_calls_total Number of HAL calls.",
+            f"# TYPE {prefix}_calls_total counter",
+        ]
+        for name, stats in self.stats.items():
+            lines.append(f'{prefix}_calls_total{{function="{name}"}} {stats.count}')
+
+        lines += [
+            f"# HELP {prefix}_call_results_total Number of HAL calls per result.",
+            f"# TYPE {prefix}_call_results_total counter",
+        ]
+        for name, stats in self.stats.items():
+            for result, n in zip(RESULTS, stats.results):
+                if n:
+                    lines.append(f'{prefix}_call_results_total{{function="{name}",result="{result}"}} {n}')
+
+        lines += [
+            f"# HELP {prefix}_call_duration_seconds Duration of HAL calls.",
+            f"# TYPE {prefix}_call_duration_seconds histogram",
+        ]
+        for name, stats in self.stats.items():
+            cumulative = 0
+            for bound, n in zip(self.bounds_us + ["+Inf"], stats.latency.counts):
+                cumulative += n
+                le = bound if bound == "+Inf" else repr(bound / 1e6)
+                lines.append(f'{prefix}_call_duration_seconds_bucket{{function="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_call_duration_seconds_sum{{function="{name}"}} {stats.latency.total_ns / 1e9!r}')
+            lines.append(f'{prefix}_call_duration_seconds_count{{function="{name}"}} {stats.latency.count}')
+        return "\n".join(lines) + "\n"
+
+
+
+def enable(bounds_us: Sequence[float] = LATENCY_BOUNDS_US) -> TracingHAL:
+    """
+    Starts tracing the current backend, or returns the active tracer if already tracing.
+    """
+    backend = hal.getBackend()
+    if isinstance(backend, TracingHAL):
+        return backend
+    tracer = TracingHAL(backend, bounds_us)
+    hal._set_backend(tracer, invalidate=False) # same devices, the cached ModInfo stays valid
+    return tracer
+
+
+
+def disable() -> Optional[TracingHAL]:
+    """
+    Restores the traced backend and returns the tracer (None if tracing was not enabled).
+    """
+    backend = hal.getBackend()
+    if not isinstance(backend, TracingHAL):
+        return None
+    hal._set_backend(backend.backend, invalidate=False)
+    return backend
@@ -42,3 +42,109 @@ ilmsens_hal_SampleType = c_int32
 
 # Represents data type for register and memory access
 ilmsens_hal_MemoryType = c_uint32
+
+class ModConfigSnapshot:
+    """
+    Immutable Python copy of an ilmsens_hal_ModConfig.
+    """
+    __slots__ = ("mOrder", "mSub", "mClk", "mOV", "mTx", "mRx")
+
+    def __init__(self, config: ilmsens_hal_ModConfig):
+        for name in self.__slots__:
+            object.__setattr__(self, name, getattr(config, name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{n}={getattr(self, n)!r}' for n in self.__slots__)})"
+
+
+class ModInfoSnapshot:
+    """
+    Immutable Python copy of an ilmsens_hal_ModInfo, with the same attribute names.
+
+    Reading its attributes never crosses into C, and scale holds the factor from raw
+    samples to voltage, mLSB_Volt / (mHWAvg x mAvg), precomputed for per-frame scaling.
+    mTemp is the device temperature at the time of the snapshot.
+    """
+    __slots__ = ("mConfig", "mTB_Fc", "mTemp", "mLSB_Volt", "mFSR", "mHWAvg", "mAvg", "mAvgLim",
+                 "mWait", "mWaitLim", "mNumSamp", "scale")
+
+    def __init__(self, info: ilmsens_hal_ModInfo):
+        values = {
+            "mConfig": ModConfigSnapshot(info.mConfig),
+            "mTB_Fc": info.mTB_Fc,
+            "mTemp": info.mTemp,
+            "mLSB_Volt": info.mLSB_Volt,
+            "mFSR": tuple(info.mFSR),
+            "mHWAvg": info.mHWAvg,
+            "mAvg": info.mAvg,
+            "mAvgLim": tuple(info.mAvgLim),
+            "mWait": info.mWait,
+            "mWaitLim": tuple(info.mWaitLim),
+            "mNumSamp": info.mNumSamp,
+            "scale": valueScale(info),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{n}={getattr(self, n)!r}' for n in self.__slots__)})"
+
+
+
+def valueScale(info) -> float:
+    """
+    Factor converting raw accumulated samples into physical voltage [V], mLSB_Volt / (mHWAvg x mAvg).
+
+    Parameters
+    ----------
+    info : ilmsens_hal_ModInfo or ModInfoSnapshot
+        device configuration, the precomputed scale of a snapshot is returned as is
+
+    Returns
+    -------
+    float
+        the scale, 0.0 while the averages are not configured
+    """
+    if isinstance(info, ModInfoSnapshot):
+        return info.scale
+    return info.mLSB_Volt / (info.mHWAvg * info.mAvg) if info.mHWAvg and info.mAvg else 0.0
+
+
+
+def modInfoStruct(info) -> ilmsens_hal_ModInfo:
+    """
+    Returns info as ilmsens_hal_ModInfo, e.g. to store a ModInfoSnapshot in a binary record.
+    """
+    if isinstance(info, ilmsens_hal_ModInfo):
+        return info
+    struct = ilmsens_hal_ModInfo()
+    for name in ModConfigSnapshot.__slots__:
+        setattr(struct.mConfig, name, getattr(info.mConfig, name))
+    for name in ("mTB_Fc", "mTemp", "mLSB_Volt", "mHWAvg", "mAvg", "mWait", "mNumSamp"):
+        setattr(struct, name, getattr(info, name))
+    for name in ("mFSR", "mAvgLim", "mWaitLim"):
+        getattr(struct, name)[:] = getattr(info, name)
+    return struct
+
+
+
+def unwrapValue(arg):
+    """
+    Unwraps a ctypes scalar (c_int, c_uint, c_size_t, ...) into a Python int, other arguments are returned as is.
+    Helps Python backends (see useBackend) accept the arguments the wrappers pass to the library.
+    """
+    return getattr(arg, "value", arg)
+
+
+
+def unwrapRef(arg):
+    """
+    Unwraps a byref() argument into the referenced ctypes object, other arguments are returned as is.
+    """
+    return getattr(arg, "_obj", arg)
@@ -1 +1,5 @@
 from .utils import *
+from .correlation import *
+from .averaging import *
+from .gating import *
+from .pipeline import *
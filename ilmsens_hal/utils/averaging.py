@@ -0,0 +1,222 @@
+import numpy as np
+from abc import ABC
+from abc import abstractmethod
+from typing import Optional
+
+
+class _FrameOperator(ABC):
+    """
+    Base of the streaming operators working on batches of frames.
+
+    A batch has the frame axis first, e.g. the (frames, devices, rx, samples) output of
+    decode_frames or Correlator. The operator state is allocated on the first batch for
+    its frame shape and updated in place afterwards; reset() discards it.
+    """
+
+    def __init__(self, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError("dtype must be float32 or float64")
+        self.shape: Optional[tuple] = None
+        self.count = 0
+
+    @abstractmethod
+    def _allocate(self, shape: tuple) -> None:
+        """Allocates the operator state for frames of the given shape."""
+
+    @abstractmethod
+    def _process(self, frames: np.ndarray, out: np.ndarray) -> None:
+        """Writes the output after each frame of a non-empty batch into out and updates the state."""
+
+    def reset(self) -> None:
+        self.shape = None
+        self.count = 0
+
+    def update(self, frames: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Feeds a batch of frames through the operator.
+
+        Parameters
+        ----------
+        frames : np.ndarray
+            batch of frames, frame axis first
+        out : np.ndarray, optional
+            preallocated output of the same shape and the operator's dtype
+
+        Returns
+        -------
+        np.ndarray
+            the operator output after each frame of the batch, out if it was given
+        """
+        if frames.shape[1:] != self.shape:
+            if self.shape is not None:
+                raise ValueError(f"expected frames of shape {self.shape}, got {frames.shape[1:]}")
+            self._allocate(frames.shape[1:])
+            self.shape = frames.shape[1:]
+        if out is None:
+            out = np.empty(frames.shape, dtype=self.dtype)
+        elif out.shape != frames.shape or out.dtype != self.dtype:
+            raise ValueError("out must match the shape of frames and the operator's dtype")
+        if len(frames):
+            self._process(frames, out)
+        return out
+
+    __call__ = update
+
+
+
+class RunningMean(_FrameOperator):
+    """
+    Cumulative mean of all frames since the last reset().
+    """
+
+    def _allocate(self, shape: tuple) -> None:
+        self._sum = np.zeros(shape, dtype=np.float64)
+
+    def _process(self, frames: np.ndarray, out: np.ndarray) -> None:
+        n = len(frames)
+        counts = np.arange(self.count + 1, self.count + n + 1, dtype=self.dtype)
+        np.cumsum(frames, axis=0, dtype=self.dtype, out=out)
+        out += self._sum.astype(self.dtype, copy=False)
+        out /= counts.reshape((n,) + (1,) * len(self.shape))
+        self._sum += frames.sum(axis=0, dtype=np.float64)
+        self.count += n
+
+    @property
+    def value(self) -> np.ndarray:
+        return (self._sum / max(self.count, 1)).astype(self.dtype)
+
+
+
+class ExponentialAverage(_FrameOperator):
+    """
+    Exponential moving average y[i] = y[i-1] + alpha * (x[i] - y[i-1]), started with the first frame.
+
+    Parameters
+    ----------
+    alpha : float
+        weight of the newest frame in (0, 1], e.g. 2 / (N + 1) for an N-frame equivalent average
+    dtype : np.float32 or np.float64
+        precision of the state and output
+    """
+
+    def __init__(self, alpha: float, dtype=np.float32):
+        super().__init__(dtype)
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = self.dtype.type(alpha)
+
+    def _allocate(self, shape: tuple) -> None:
+        self._state = np.zeros(shape, dtype=self.dtype)
+
+    def _process(self, frames: np.ndarray, out: np.ndarray) -> None:
+        state = self._state
+        start = 0
+        if self.count == 0:
+            state[...] = frames[0]
+            out[0] = state
+            start = 1
+        for i in range(start, len(frames)):
+            np.subtract(frames[i], state, out=out[i], dtype=self.dtype, casting="unsafe")
+            out[i] *= self.alpha
+            state += out[i]
+            out[i] = state
+        self.count += len(frames)
+
+    @property
+    def value(self) -> np.ndarray:
+        return self._state.copy()
+
+
+
+class SlidingAverage(_FrameOperator):
+    """
+    Mean of the last window frames (fewer until the window has filled).
+
+    Parameters
+    ----------
+    window : int
+        number of averaged frames
+    dtype : np.float32 or np.float64
+        precision of the history and output, the running sum is kept in float64
+    """
+
+    def __init__(self, window: int, dtype=np.float32):
+        super().__init__(dtype)
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+
+    def _allocate(self, shape: tuple) -> None:
+        self._history = np.zeros((self.window,) + shape, dtype=self.dtype)
+        self._sum = np.zeros(shape, dtype=np.float64)
+
+    def _process(self, frames: np.ndarray, out: np.ndarray) -> None:
+        for i in range(len(frames)):
+            slot = self._history[self.count % self.window]
+            if self.count >= self.window:
+                self._sum -= slot
+            slot[...] = frames[i]
+            self._sum += slot
+            self.count += 1
+            np.divide(self._sum, min(self.count, self.window), out=out[i], casting="unsafe")
+
+    @property
+    def value(self) -> np.ndarray:
+        return (self._sum / max(min(self.count, self.window), 1)).astype(self.dtype)
+
+
+
+class BackgroundSubtraction(_FrameOperator):
+    """
+    Subtracts a static background estimated as the mean of num_frames frames.
+
+    The first num_frames frames estimate the initial background, they are output relative
+    to the partial estimate. With an interval, a new estimate is collected from the
+    num_frames frames following every interval-th frame and replaces the current
+    background once complete, which tracks slow drifts of the static scene.
+
+    Parameters
+    ----------
+    num_frames : int
+        number of frames averaged into one background estimate
+    interval : int, optional
+        re-estimate the background every interval frames, never if None
+    dtype : np.float32 or np.float64
+        precision of the background and output
+    """
+
+    def __init__(self, num_frames: int = 16, interval: Optional[int] = None, dtype=np.float32):
+        super().__init__(dtype)
+        if num_frames < 1:
+            raise ValueError("num_frames must be at least 1")
+        if interval is not None and interval < num_frames:
+            raise ValueError("interval must be at least num_frames")
+        self.num_frames = num_frames
+        self.interval = interval
+        self.estimates = 0
+
+    def _allocate(self, shape: tuple) -> None:
+        self.background = np.zeros(shape, dtype=self.dtype)
+        self._acc = np.zeros(shape, dtype=np.float64)
+        self._acc_count = 0
+
+    def reset(self) -> None:
+        super().reset()
+        self.estimates = 0
+
+    def _process(self, frames: np.ndarray, out: np.ndarray) -> None:
+        for i in range(len(frames)):
+            phase = self.count if self.interval is None else self.count % self.interval
+            if phase == 0:
+                self._acc[...] = 0
+                self._acc_count = 0
+            if phase < self.num_frames:
+                self._acc += frames[i]
+                self._acc_count += 1
+                if self.estimates == 0 or self._acc_count == self.num_frames:
+                    np.divide(self._acc, self._acc_count, out=self.background, casting="unsafe")
+                if self._acc_count == self.num_frames:
+                    self.estimates += 1
+            np.subtract(frames[i], self.background, out=out[i], dtype=self.dtype, casting="unsafe")
+            self.count += 1
@@ -0,0 +1,149 @@
+import numpy as np
+from typing import Optional
+from ilmsens_hal.types import ilmsens_hal_ModInfo
+from ilmsens_hal.types import valueScale
+from .utils import read_dependencies
+
+
+# np.fft accepts out= since NumPy 2.0
+_FFT_HAS_OUT = int(np.__version__.split(".")[0]) >= 2
+
+
+
+def _single_precision_fft():
+    """scipy.fft if SciPy is installed; np.fft transforms float32 in double precision."""
+    try:
+        import scipy.fft
+    except ImportError:
+        return None
+    return scipy.fft
+
+
+
+def value_scale(mod_info: ilmsens_hal_ModInfo) -> float:
+    """
+    Factor converting raw accumulated samples into physical voltage [V], see ilmsens_hal.types.valueScale.
+    """
+    return valueScale(mod_info)
+
+
+
+class Correlator:
+    """
+    Batched impulse-response processor.
+
+    Scales raw frames to voltage and correlates them with the reference spectrum
+    mDR_Ref_Spec along the last axis using real-input FFTs. The result equals the
+    real part of np.fft.ifft(np.fft.fft(data) * mDR_Ref_Spec), i.e. the correlation
+    done in the example notebook, for any number of frames, devices and receivers.
+
+    Parameters
+    ----------
+    mod_info : ilmsens_hal_ModInfo, optional
+        device configuration; provides MLBS order, clock, OV and the value scale
+    mDR_MLBS_Order : int
+        MLBS order, used if mod_info is not given
+    mDR_F0_Clk : float
+        RF system clock [GHz], used if mod_info is not given
+    mDR_OV : int
+        oversampling factor, used if mod_info is not given
+    scale : float, optional
+        factor from raw samples to voltage, overrides the one derived from mod_info (default 1.0 without mod_info)
+    dtype : np.float32 or np.float64
+        precision of the output; float32 is computed in single precision with scipy.fft if
+        SciPy is installed, otherwise in double precision and only stored as float32
+    workers : int, optional
+        number of threads of scipy.fft for float32 (-1 for all cores), ignored without SciPy
+    """
+
+    def __init__(self, mod_info: Optional[ilmsens_hal_ModInfo] = None, mDR_MLBS_Order: int = 9,
+                 mDR_F0_Clk: float = 13.312, mDR_OV: int = 1, scale: Optional[float] = None, dtype=np.float32,
+                 workers: Optional[int] = None):
+        if mod_info is not None:
+            mDR_MLBS_Order = mod_info.mConfig.mOrder
+            mDR_F0_Clk = mod_info.mConfig.mClk
+            mDR_OV = mod_info.mConfig.mOV
+            if scale is None:
+                scale = value_scale(mod_info)
+        if scale is None:
+            scale = 1.0
+
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError("dtype must be float32 or float64")
+        self.workers = workers
+        # np.fft computes float32 in double precision and allocates the converted copies on
+        # every call, so without scipy.fft the work buffers stay double and only out is float32
+        self._fft = _single_precision_fft() if self.dtype == np.float32 else None
+        self.work_dtype = self.dtype if self._fft is not None else np.dtype(np.float64)
+        cdtype = np.complex64 if self.work_dtype == np.float32 else np.complex128
+
+        dependencies = read_dependencies(mDR_MLBS_Order, mDR_F0_Clk, mDR_OV)
+        ref_spec = dependencies["mDR_Ref_Spec"]
+        self.num_samples = len(ref_spec)
+        self.scale = self.work_dtype.type(scale)
+
+        # the Hermitian part of the reference spectrum yields the real part of the full
+        # complex correlation, which also covers the asymmetric clock feed-through suppression
+        k = np.arange(self.num_samples // 2 + 1)
+        half_spec = (ref_spec[k] + np.conj(ref_spec[-k % self.num_samples])) / 2
+        self.ref_spec = half_spec.astype(cdtype)
+        self._work = {}
+
+    def _buffers(self, shape: tuple):
+        buffers = self._work.get(shape)
+        if buffers is None:
+            spec_shape = shape[:-1] + (self.num_samples // 2 + 1,)
+            buffers = (
+                np.empty(shape, dtype=self.work_dtype),
+                np.empty(spec_shape, dtype=self.ref_spec.dtype)
+            )
+            self._work[shape] = buffers
+        return buffers
+
+    def correlate(self, samples: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Scales and correlates a batch of raw frames.
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            raw samples with the sample axis last, e.g. the (frames, devices, rx, samples)
+            view from decode_frames
+        out : np.ndarray, optional
+            preallocated output of the same shape and the correlator's dtype
+
+        Returns
+        -------
+        np.ndarray
+            the impulse responses [V], out if it was given
+        """
+        if samples.shape[-1] != self.num_samples:
+            raise ValueError(f"expected {self.num_samples} samples per channel, got {samples.shape[-1]}")
+        if out is None:
+            out = np.empty(samples.shape, dtype=self.dtype)
+        elif out.shape != samples.shape or out.dtype != self.dtype:
+            raise ValueError("out must match the shape of samples and the correlator's dtype")
+
+        work, spec = self._buffers(samples.shape)
+        np.multiply(samples, self.scale, out=work, dtype=self.work_dtype, casting="unsafe")
+        if self._fft is not None:
+            # scipy.fft has no out=, but transforms float32 natively and may reuse its inputs
+            spec = self._fft.rfft(work, axis=-1, overwrite_x=True, workers=self.workers)
+            spec *= self.ref_spec
+            out[...] = self._fft.irfft(spec, n=self.num_samples, axis=-1, overwrite_x=True, workers=self.workers)
+        elif _FFT_HAS_OUT:
+            np.fft.rfft(work, axis=-1, out=spec)
+            spec *= self.ref_spec
+            if out.dtype == work.dtype:
+                np.fft.irfft(spec, n=self.num_samples, axis=-1, out=out)
+            else:
+                np.fft.irfft(spec, n=self.num_samples, axis=-1, out=work)
+                np.copyto(out, work, casting="same_kind")
+        else:
+            spec = np.fft.rfft(work, axis=-1)
+            spec *= self.ref_spec
+            out[...] = np.fft.irfft(spec, n=self.num_samples, axis=-1)
+        return out
+
+    __call__ = correlate
@@ -0,0 +1,188 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+from ilmsens_hal.types import ilmsens_hal_ModInfo
+from .correlation import Correlator
+from .utils import read_dependencies
+
+
+"""The partial correlation matrix is used for gates of at most this fraction of the samples ..."""
+MATRIX_MAX_FRACTION = 1 / 8
+"""... and at most this size [bytes], wider gates correlate the full response and select the bins"""
+MATRIX_MAX_BYTES = 32 << 20
+
+
+
+def gate_bins(times: np.ndarray, windows: Sequence[Tuple[float, float]], decimation: int = 1) -> np.ndarray:
+    """
+    Indices of the delay bins inside the windows, every decimation-th bin of each window.
+
+    Parameters
+    ----------
+    times : np.ndarray
+        delay time axis [ns], e.g. mDR_Ref_Times of read_dependencies
+    windows : Sequence[Tuple[float, float]]
+        delay-time windows [start, stop) [ns]
+    decimation : int
+        keep every decimation-th bin of a window, starting with its first one
+
+    Returns
+    -------
+    np.ndarray
+        ascending, unique bin indices
+    """
+    bins = []
+    for start, stop in windows:
+        inside = np.flatnonzero((times >= start) & (times < stop))
+        bins.append(inside[::decimation])
+    if not bins:
+        return np.empty(0, dtype=np.intp)
+    return np.unique(np.concatenate(bins))
+
+
+
+class RangeGate:
+    """
+    Range gating and decimation of impulse responses.
+
+    Keeps only the delay bins inside delay-time windows (on the mDR_Ref_Times axis),
+    optionally thinned by decimation, with separate windows per Rx if needed; all Rx must
+    keep the same number of bins. The output replaces the sample axis by the kept bins,
+    e.g. (frames, devices, rx, bins), and times holds their delay times.
+
+    correlate() computes the gated responses from raw samples. For narrow gates it skips
+    the FFT: the correlation with mDR_Ref_Spec is a circular convolution with the real kernel
+    g = irfft(spectrum), so bin n is sum_m x[m] g[n - m], and the kept rows of this partial
+    correlation matrix (scaled to voltage) are precomputed once and applied as one matrix
+    product. Wider gates run the full Correlator and select the bins. Both give the bins
+    of Correlator.correlate. select() gates responses correlated elsewhere.
+
+    Parameters
+    ----------
+    mod_info : ilmsens_hal_ModInfo, optional
+        device configuration; provides MLBS order, clock, OV, number of Rx and the value scale
+    windows : Sequence[Tuple[float, float]], optional
+        delay-time windows [start, stop) [ns] for all Rx, defaults to the whole response
+    rx_windows : Sequence[Sequence[Tuple[float, float]]], optional
+        windows of each Rx, overriding windows
+    decimation : int
+        keep every decimation-th bin of a window
+    method : str
+        "matrix", "fft" or "auto" to choose by gate width (MATRIX_MAX_FRACTION, MATRIX_MAX_BYTES)
+    mDR_MLBS_Order, mDR_F0_Clk, mDR_OV, num_rx :
+        configuration used if mod_info is not given
+    scale : float, optional
+        factor from raw samples to voltage, overrides the one derived from mod_info
+    dtype : np.float32 or np.float64
+        precision of the computation and output
+    """
+
+    def __init__(self, mod_info: Optional[ilmsens_hal_ModInfo] = None,
+                 windows: Optional[Sequence[Tuple[float, float]]] = None,
+                 rx_windows: Optional[Sequence[Sequence[Tuple[float, float]]]] = None, decimation: int = 1,
+                 method: str = "auto", mDR_MLBS_Order: int = 9, mDR_F0_Clk: float = 13.312, mDR_OV: int = 1,
+                 num_rx: int = 2, scale: Optional[float] = None, dtype=np.float32):
+        if method not in ("auto", "matrix", "fft"):
+            raise ValueError(f"unknown method '{method}'")
+        if decimation < 1:
+            raise ValueError("decimation must be at least 1")
+        if mod_info is not None:
+            mDR_MLBS_Order = mod_info.mConfig.mOrder
+            mDR_F0_Clk = mod_info.mConfig.mClk
+            mDR_OV = mod_info.mConfig.mOV
+            num_rx = mod_info.mConfig.mRx
+
+        self.correlator = Correlator(mod_info, mDR_MLBS_Order, mDR_F0_Clk, mDR_OV, scale, dtype)
+        self.dtype = self.correlator.dtype
+        self.num_samples = self.correlator.num_samples
+        ref_times = read_dependencies(mDR_MLBS_Order, mDR_F0_Clk, mDR_OV)["mDR_Ref_Times"]
+
+        if rx_windows is None:
+            rx_windows = [windows if windows is not None else [(ref_times[0], np.inf)]] * num_rx
+        if len(rx_windows) != num_rx:
+            raise ValueError(f"rx_windows must list the windows of {num_rx} Rx")
+        bins = [gate_bins(ref_times, w, decimation) for w in rx_windows]
+        if len({len(b) for b in bins}) != 1:
+            raise ValueError(f"the windows keep different numbers of bins per Rx: {[len(b) for b in bins]}")
+        self.bins = np.array(bins) # (rx, bins)
+        self.times = ref_times[self.bins]
+        self.num_bins = self.bins.shape[1]
+        if not self.num_bins:
+            raise ValueError("the windows do not contain any delay bin")
+        self._shared = all(np.array_equal(b, self.bins[0]) for b in self.bins[1:])
+
+        if method == "auto":
+            fits = self.num_bins * self.num_samples * self.dtype.itemsize * (1 if self._shared else num_rx) <= MATRIX_MAX_BYTES
+            method = "matrix" if fits and self.num_bins <= MATRIX_MAX_FRACTION * self.num_samples else "fft"
+        self.method = method
+        self._matrices = self._partial_matrices() if method == "matrix" else None
+        self._work = {}
+
+    def _partial_matrices(self) -> np.ndarray:
+        """Rows of the scaled correlation matrix for the kept bins, transposed: (rx or 1, samples, bins)."""
+        n = self.num_samples
+        kernel = np.fft.irfft(self.correlator.ref_spec.astype(np.complex128), n=n) * float(self.correlator.scale)
+        rows = self.bins[:1] if self._shared else self.bins
+        m = np.arange(n)
+        return np.stack([kernel[(b[np.newaxis, :] - m[:, np.newaxis]) % n] for b in rows]).astype(self.dtype)
+
+    def _buffer(self, shape: tuple) -> np.ndarray:
+        buffer = self._work.get(shape)
+        if buffer is None:
+            buffer = np.empty(shape, dtype=self.dtype)
+            self._work[shape] = buffer
+        return buffer
+
+    def _check_out(self, shape: tuple, out: Optional[np.ndarray]) -> np.ndarray:
+        shape = shape[:-1] + (self.num_bins,)
+        if out is None:
+            return np.empty(shape, dtype=self.dtype)
+        if out.shape != shape or out.dtype != self.dtype:
+            raise ValueError(f"out must be a {self.dtype} array of shape {shape}")
+        return out
+
+    def select(self, responses: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Gates full impulse responses of shape (..., rx, samples) into (..., rx, bins).
+        """
+        out = self._check_out(responses.shape, out)
+        if self._shared:
+            np.take(responses, self.bins[0], axis=-1, out=out, mode="clip")
+        else:
+            for rx, bins in enumerate(self.bins):
+                np.take(responses[..., rx, :], bins, axis=-1, out=out[..., rx, :], mode="clip")
+        return out
+
+    def correlate(self, samples: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Scales, correlates and gates a batch of raw frames.
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            raw samples of shape (..., rx, samples), e.g. the view from decode_frames
+        out : np.ndarray, optional
+            preallocated output of shape (..., rx, bins) and the gate's dtype
+
+        Returns
+        -------
+        np.ndarray
+            the gated impulse responses [V], out if it was given
+        """
+        if samples.shape[-1] != self.num_samples:
+            raise ValueError(f"expected {self.num_samples} samples per channel, got {samples.shape[-1]}")
+        out = self._check_out(samples.shape, out)
+        work = self._buffer(samples.shape)
+        if self.method == "fft":
+            return self.select(self.correlator.correlate(samples, out=work), out=out)
+
+        np.copyto(work, samples, casting="unsafe")
+        if self._shared and out.flags.c_contiguous:
+            np.matmul(work.reshape(-1, self.num_samples), self._matrices[0], out=out.reshape(-1, self.num_bins))
+        elif self._shared:
+            np.matmul(work, self._matrices[0], out=out)
+        else:
+            for rx, matrix in enumerate(self._matrices):
+                np.matmul(work[..., rx, :], matrix, out=out[..., rx, :])
+        return out
+
+    __call__ = correlate
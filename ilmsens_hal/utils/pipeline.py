@@ -0,0 +1,336 @@
+import queue
+import threading
+import time
+import numpy as np
+from abc import ABC
+from abc import abstractmethod
+from typing import Callable, Iterable, Iterator, List, Optional
+from ilmsens_hal.monitor import LatencyHistogram
+from ilmsens_hal.types import ilmsens_hal_ModInfo
+from .correlation import Correlator
+from .correlation import value_scale
+from .gating import RangeGate
+from .utils import decode_frames
+
+
+class Batch:
+    """
+    A batch of frames travelling through a Pipeline.
+
+    data holds the current representation (raw buffer, samples, impulse responses, ...),
+    each stage replaces it with its output; seq_counter is set by Decode.
+    """
+    __slots__ = ("index", "data", "seq_counter", "timestamp")
+
+    def __init__(self, index: int, data, timestamp: float):
+        self.index = index
+        self.data = data
+        self.seq_counter: Optional[np.ndarray] = None
+        self.timestamp = timestamp
+
+
+
+class Stage(ABC):
+    """
+    Base of the pipeline stages.
+
+    A stage transforms batch.data in place or into output arrays it owns. Outputs are
+    preallocated per input shape and reused; a stage keeps num_buffers of them in rotation,
+    which the Pipeline raises when stages run on separate threads so a buffer is not
+    overwritten while the following stage still reads it.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or type(self).__name__
+        self.num_buffers = 1
+        self._outputs = {}
+
+    def _output(self, shape: tuple, dtype) -> np.ndarray:
+        key = (shape, np.dtype(dtype))
+        ring = self._outputs.get(key)
+        if ring is None:
+            ring = [[np.empty(shape, dtype=dtype) for _ in range(self.num_buffers)], 0]
+            self._outputs[key] = ring
+        buffers, i = ring
+        ring[1] = (i + 1) % len(buffers)
+        return buffers[i]
+
+    @abstractmethod
+    def process(self, batch: Batch) -> None:
+        """Transforms batch.data in place or replaces it with the stage output."""
+
+
+
+class Decode(Stage):
+    """
+    Raw measGet buffers -> int32 samples view (frames, devices, rx, samples), no copy.
+    """
+
+    def __init__(self, mod_info: ilmsens_hal_ModInfo, num_devices: int = 1, name: Optional[str] = None):
+        super().__init__(name)
+        self.mod_info = mod_info
+        self.num_devices = num_devices
+
+    def process(self, batch: Batch) -> None:
+        batch.data, batch.seq_counter = decode_frames(batch.data, self.mod_info, num_devices=self.num_devices)
+
+
+
+class Scale(Stage):
+    """
+    Raw samples -> voltage [V] in a preallocated float array.
+
+    Parameters
+    ----------
+    mod_info : ilmsens_hal_ModInfo, optional
+        provides the value scale (see value_scale)
+    scale : float, optional
+        factor overriding the one of mod_info
+    dtype : np.float32 or np.float64
+        output precision
+    """
+
+    def __init__(self, mod_info: Optional[ilmsens_hal_ModInfo] = None, scale: Optional[float] = None,
+                 dtype=np.float32, name: Optional[str] = None):
+        super().__init__(name)
+        if scale is None:
+            scale = value_scale(mod_info) if mod_info is not None else 1.0
+        self.dtype = np.dtype(dtype)
+        self.scale = self.dtype.type(scale)
+
+    def process(self, batch: Batch) -> None:
+        out = self._output(batch.data.shape, self.dtype)
+        np.multiply(batch.data, self.scale, out=out, dtype=self.dtype, casting="unsafe")
+        batch.data = out
+
+
+
+class Correlate(Stage):
+    """
+    Samples -> impulse responses with a Correlator, into a preallocated array.
+
+    The Correlator scales by itself; after a Scale stage pass one created with scale=1.0.
+    """
+
+    def __init__(self, correlator: Correlator, name: Optional[str] = None):
+        super().__init__(name)
+        self.correlator = correlator
+
+    def process(self, batch: Batch) -> None:
+        out = self._output(batch.data.shape, self.correlator.dtype)
+        batch.data = self.correlator.correlate(batch.data, out=out)
+
+
+
+class Gate(Stage):
+    """
+    Samples -> range-gated impulse responses (..., rx, bins) with a RangeGate, into a preallocated array.
+
+    With correlated=True the input are full impulse responses (e.g. after Correlate), which are only gated.
+    """
+
+    def __init__(self, gate: RangeGate, correlated: bool = False, name: Optional[str] = None):
+        super().__init__(name)
+        self.gate = gate
+        self.correlated = correlated
+
+    def process(self, batch: Batch) -> None:
+        out = self._output(batch.data.shape[:-1] + (self.gate.num_bins,), self.gate.dtype)
+        if self.correlated:
+            batch.data = self.gate.select(batch.data, out=out)
+        else:
+            batch.data = self.gate.correlate(batch.data, out=out)
+
+
+
+class Crop(Stage):
+    """
+    Keeps the samples [start, stop) of the last axis as a view, no copy.
+    """
+
+    def __init__(self, start: int = 0, stop: Optional[int] = None, name: Optional[str] = None):
+        super().__init__(name)
+        self.window = slice(start, stop)
+
+    def process(self, batch: Batch) -> None:
+        batch.data = batch.data[..., self.window]
+
+
+
+class Apply(Stage):
+    """
+    Runs func(data, out) and continues with its result.
+
+    func receives a preallocated output array of the input's shape and out_dtype, e.g. one
+    of the streaming operators (ExponentialAverage, BackgroundSubtraction, ...). With
+    out_dtype None it is called as func(data) and may work in place.
+    """
+
+    def __init__(self, func: Callable, out_dtype=None, name: Optional[str] = None):
+        super().__init__(name or getattr(func, "__name__", type(func).__name__))
+        self.func = func
+        self.out_dtype = out_dtype
+
+    def process(self, batch: Batch) -> None:
+        if self.out_dtype is None:
+            result = self.func(batch.data)
+        else:
+            result = self.func(batch.data, self._output(batch.data.shape, self.out_dtype))
+        if result is not None:
+            batch.data = result
+
+
+
+class Sink(Stage):
+    """
+    Hands each batch to func(batch), e.g. to store or display it; the data is not changed.
+    """
+
+    def __init__(self, func: Callable[[Batch], None], name: Optional[str] = None):
+        super().__init__(name or getattr(func, "__name__", type(func).__name__))
+        self.func = func
+
+    def process(self, batch: Batch) -> None:
+        self.func(batch)
+
+
+
+_END = object()
+
+
+class Pipeline:
+    """
+    Chain of stages applied to every batch of a source, e.g.
+    Pipeline([Decode(info), Correlate(Correlator(info)), Crop(0, 200), Sink(store)]).
+
+    Stages run one after the other on the calling thread, or, if threaded, each on its own
+    thread connected by bounded queues, which overlaps the stages of consecutive batches.
+    The time every stage spends per batch is recorded in a LatencyHistogram.
+
+    The data yielded by run() lives in buffers owned by the stages and is overwritten by a
+    later batch; in threaded mode the source must likewise not reuse a buffer before the
+    pipeline is done with it (e.g. a BufferRing with more slots than batches can be in flight,
+    queue_size x (stages + 1) + stages + 1).
+
+    Parameters
+    ----------
+    stages : List[Stage]
+        the stages in processing order
+    threaded : bool
+        run every stage on a dedicated thread
+    queue_size : int
+        bound of the queues between threaded stages
+    """
+
+    def __init__(self, stages: List[Stage], threaded: bool = False, queue_size: int = 2):
+        self.stages = list(stages)
+        self.threaded = threaded
+        self.queue_size = queue_size
+        # stages may pass views of their outputs on (Crop), so in threaded mode an output must
+        # survive every batch that can be in flight: queued, in work and held by the consumer
+        in_flight = queue_size * (len(self.stages) + 1) + len(self.stages) + 1
+        names = set()
+        for i, stage in enumerate(self.stages):
+            stage.num_buffers = in_flight if threaded else 1
+            if stage.name in names:
+                stage.name = f"{stage.name}{i}"
+            names.add(stage.name)
+        self.timing = {stage.name: LatencyHistogram() for stage in self.stages}
+
+    def _apply(self, stage: Stage, batch: Batch) -> None:
+        start = time.perf_counter_ns()
+        stage.process(batch)
+        self.timing[stage.name].record(time.perf_counter_ns() - start)
+
+    def process(self, data) -> Batch:
+        """
+        Runs one batch through all stages on the calling thread.
+        """
+        batch = Batch(0, data, time.monotonic())
+        for stage in self.stages:
+            self._apply(stage, batch)
+        return batch
+
+    def run(self, source: Iterable) -> Iterator[Batch]:
+        """
+        Runs all batches of source through the stages and yields them in order.
+        """
+        if not self.threaded:
+            for index, data in enumerate(source):
+                batch = Batch(index, data, time.monotonic())
+                for stage in self.stages:
+                    self._apply(stage, batch)
+                yield batch
+            return
+
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        errors = []
+
+        def put(q: queue.Queue, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def feed():
+            try:
+                for index, data in enumerate(source):
+                    if not put(queues[0], Batch(index, data, time.monotonic())):
+                        return
+            except Exception as e:
+                errors.append(e)
+            put(queues[0], _END)
+
+        def work(stage: Stage, inbox: queue.Queue, outbox: queue.Queue):
+            while True:
+                batch = inbox.get()
+                if batch is _END:
+                    break
+                try:
+                    self._apply(stage, batch)
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+                    break
+                if not put(outbox, batch):
+                    break
+            put(outbox, _END)
+
+        threads = [threading.Thread(target=feed, name="ilmsens-pipeline-source", daemon=True)]
+        for i, stage in enumerate(self.stages):
+            threads.append(threading.Thread(target=work, args=(stage, queues[i], queues[i+1]),
+                                            name=f"ilmsens-pipeline-{stage.name}", daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                try:
+                    batch = queues[-1].get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+                if batch is _END:
+                    break
+                yield batch
+        finally:
+            stop.set()
+            for q in queues: # unblock stages waiting for input
+                try:
+                    q.put_nowait(_END)
+                except queue.Full:
+                    pass
+            for thread in threads:
+                thread.join(timeout=1.0)
+        if errors:
+            raise errors[0]
+
+    def stats(self) -> dict:
+        """
+        Per-stage timing statistics, see LatencyHistogram.stats().
+        """
+        return {name: histogram.stats() for name, histogram in self.timing.items()}
@@ -1,41 +1,144 @@
 import os
-import struct
 import numpy as np
 from ctypes import sizeof
+from functools import lru_cache
+from typing import Optional, Tuple
 from ilmsens_hal.types import ilmsens_hal_MemoryType
+from ilmsens_hal.types import ilmsens_hal_ModInfo
+
+
+"""Maximum number of (order, F0 clock, OV) reference sets kept in memory"""
+DEPENDENCIES_CACHE_SIZE = 16
+
+"""Directory for the binary cache of the ideal MLBS, may be overridden by ILMSENS_HAL_CACHE_DIR"""
+MLBS_CACHE_DIR = os.environ.get(
+    "ILMSENS_HAL_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ilmsens_hal")
+)
+
+
+
+def frame_dtype(num_samples: int, num_rx: int = 2, num_devices: int = 1, num_status: int = 1) -> np.dtype:
+    """
+    Structured dtype of one measurement frame as delivered by measGet/measRead.
+
+    Each device contributes num_rx channels of 2^order x OV little-endian int32 words:
+    the (2^order - 1) x OV samples followed by OV status words. The last status word
+    of the first channel of each device is its sequence counter.
+
+    Parameters
+    ----------
+    num_samples : int
+        number of samples per channel (ilmsens_hal_ModInfo.mNumSamp)
+    num_rx : int
+        number of receivers per device (ilmsens_hal_ModInfo.mConfig.mRx)
+    num_devices : int
+        number of devices in the measurement group
+    num_status : int
+        number of status words per channel (ilmsens_hal_ModInfo.mConfig.mOV)
+    """
+    channel = np.dtype([("samples", "<i4", (num_samples,)), ("status", "<i4", (num_status,))])
+    return np.dtype([("channels", channel, (num_devices, num_rx))])
+
+
+
+def decode_frames(buffer, mod_info: Optional[ilmsens_hal_ModInfo] = None, num_devices: int = 1,
+                  num_samples: Optional[int] = None, num_rx: Optional[int] = None,
+                  num_status: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decodes all complete frames in buffer without copying.
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        raw data returned by measGet/measRead, may hold several frames
+    mod_info : ilmsens_hal_ModInfo, optional
+        device configuration to take num_samples, num_rx and num_status from
+    num_devices : int
+        number of devices the data was read from
+    num_samples : int, optional
+        number of samples per channel, overrides mod_info
+    num_rx : int, optional
+        number of receivers per device, overrides mod_info
+    num_status : int, optional
+        number of status words per channel, overrides mod_info
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        int32 samples view of shape (frames, devices, rx, samples) and
+        int32 sequence counters of shape (frames, devices)
+    """
+    if num_samples is None:
+        num_samples = mod_info.mNumSamp if mod_info is not None else 511
+    if num_rx is None:
+        num_rx = mod_info.mConfig.mRx if mod_info is not None else 2
+    if num_status is None:
+        num_status = mod_info.mConfig.mOV if mod_info is not None else 1
+
+    dtype = frame_dtype(num_samples, num_rx, num_devices, num_status)
+    num_frames = memoryview(buffer).nbytes // dtype.itemsize
+    frames = np.frombuffer(buffer, dtype=dtype, count=num_frames)
+    channels = frames["channels"]
+    return channels["samples"], channels["status"][:, :, 0, -1]
+
+
+
+def parse_data(buffer, num_samples: int = 511) -> dict:
+    s = sizeof(ilmsens_hal_MemoryType)
+    samples, seq_counter = decode_frames(buffer, num_samples=num_samples, num_rx=2)
 
+    return {
+        "seq_counter": seq_counter[0, :1],
+        "rx1_samples": samples[0, 0, 0],
+        "rx2_samples": samples[0, 0, 1],
+        "reserved": bytes(buffer[2*(num_samples*s)+4:])
+    }
 
 
-def parse_data(buffer) -> tuple:
-    num_samples = 511
-    s = sizeof(ilmsens_hal_MemoryType)
-    rx1_samples = buffer[:num_samples*s]
-    seq_counter = buffer[num_samples*s:(num_samples*s)+4]
-    rx2_samples = buffer[(num_samples*s)+4:2*(num_samples*s)+4]
-    reserved = buffer[2*(num_samples*s)+4:]
 
-    rx1_samples = struct.unpack("<%di" % (len(rx1_samples)//4), rx1_samples)
-    rx2_samples = struct.unpack("<%di" % (len(rx2_samples)//4), rx2_samples)
-    seq_counter = struct.unpack("<%di" % (len(seq_counter)//4), seq_counter)
+@lru_cache(maxsize=None)
+def ideal_mlbs(mDR_MLBS_Order: int) -> np.ndarray:
+    """
+    Returns the ideal MLBS of the given order as a read-only double array.
 
-    return {
-        "seq_counter": seq_counter,
-        "rx1_samples": rx1_samples,
-        "rx2_samples": rx2_samples,
-        "reserved": reserved
-    }
+    The sequence is parsed from the packaged text file once and stored as .npy in
+    MLBS_CACHE_DIR, later cold starts memory-map the binary copy instead.
+    """
+    tNumSamp = 2**(mDR_MLBS_Order)-1
+    tMLBSName = f"mlbs{mDR_MLBS_Order}"
+    dirName = os.path.dirname(os.path.abspath(__file__))
+    txtPath = os.path.join(dirName, tMLBSName + ".txt")
+    npyPath = os.path.join(MLBS_CACHE_DIR, tMLBSName + ".npy")
+
+    try:
+        if os.path.getmtime(npyPath) >= os.path.getmtime(txtPath):
+            tMLBSOrg = np.load(npyPath, mmap_mode='r')
+            if tMLBSOrg.shape == (tNumSamp,):
+                return tMLBSOrg
+    except (OSError, ValueError):
+        pass
+
+    tMLBSOrg = np.loadtxt(txtPath, delimiter=',').astype(np.double)
+    tMLBSOrg = tMLBSOrg.reshape(-1, order='F')
+    tMLBSOrg = np.ascontiguousarray(tMLBSOrg[:tNumSamp])
 
+    try:
+        os.makedirs(MLBS_CACHE_DIR, exist_ok=True)
+        tmpPath = f"{npyPath}.{os.getpid()}.tmp"
+        with open(tmpPath, "wb") as f:
+            np.save(f, tMLBSOrg)
+        os.replace(tmpPath, npyPath)
+    except OSError:
+        pass # cache directory not writable, keep the parsed copy in memory only
 
+    tMLBSOrg.setflags(write=False)
+    return tMLBSOrg
 
-def read_dependencies(mDR_MLBS_Order: int = 9, mDR_F0_Clk: float = 13.312, mDR_OV: int = 1) -> dict:
-    mDR_Ref_Spec = None
-    mDR_Ref_MLBS = None
-    mDR_Ref_Times = None
-    mDR_Ref_Frqs = None
 
-    if mDR_MLBS_Order not in [9, 12, 15]:
-        raise NotImplementedError("Only implemented for 9-th, 12-th and 15-th order m-sequence.")
 
+@lru_cache(maxsize=DEPENDENCIES_CACHE_SIZE)
+def _compute_dependencies(mDR_MLBS_Order: int, mDR_F0_Clk: float, mDR_OV: int) -> dict:
     # prepare delay time and frequency axis
     tNumSamp = (2**(mDR_MLBS_Order)-1)*mDR_OV
     tTimeStep = 1/(mDR_F0_Clk*mDR_OV) # equivalent sampling time step [ns]
@@ -46,11 +149,7 @@ def read_dependencies(mDR_MLBS_Order: int = 9, mDR_F0_Clk: float = 13.312, mDR_O
 
     # prepare ideal MLBS for correlation
     tNumSamp = 2**(mDR_MLBS_Order)-1
-    tMLBSName = f"mlbs{mDR_MLBS_Order}.txt"
-    dirName = os.path.dirname(os.path.abspath(__file__))
-    tMLBSOrg = np.loadtxt(os.path.join(dirName, tMLBSName), delimiter=',').astype(np.double)
-    tMLBSOrg = tMLBSOrg.reshape(-1, order='F')
-    tMLBSOrg = tMLBSOrg[:tNumSamp]
+    tMLBSOrg = ideal_mlbs(mDR_MLBS_Order)
 
     # construct reference MLBS
     tBB_MLBS = np.repeat(tMLBSOrg, mDR_OV)
@@ -69,9 +168,35 @@ def read_dependencies(mDR_MLBS_Order: int = 9, mDR_F0_Clk: float = 13.312, mDR_O
         mDR_Ref_Spec[tNumSamp+1] = mDR_Ref_Spec[tNumSamp+1] * 0.001
         mDR_Ref_Spec[(mDR_OV-1)*tNumSamp+1] = mDR_Ref_Spec[(mDR_OV-1)*tNumSamp+1] * 0.001
 
-    return {
+    dependencies = {
         "mDR_Ref_Spec": mDR_Ref_Spec,
         "mDR_Ref_MLBS": mDR_Ref_MLBS,
         "mDR_Ref_Times": mDR_Ref_Times,
         "mDR_Ref_Frqs": mDR_Ref_Frqs,
     }
+    for value in dependencies.values():
+        value.setflags(write=False) # shared between callers
+    return dependencies
+
+
+
+def read_dependencies(mDR_MLBS_Order: int = 9, mDR_F0_Clk: float = 13.312, mDR_OV: int = 1) -> dict:
+    """
+    Returns the reference MLBS, its correlation spectrum and the delay time and frequency axes.
+
+    Results are memoized per (order, F0 clock, OV) in a bounded LRU cache. The returned
+    arrays are shared and read-only, copy them before modifying.
+    """
+    if mDR_MLBS_Order not in [9, 12, 15]:
+        raise NotImplementedError("Only implemented for 9-th, 12-th and 15-th order m-sequence.")
+
+    return dict(_compute_dependencies(int(mDR_MLBS_Order), float(mDR_F0_Clk), int(mDR_OV)))
+
+
+
+def clear_dependencies_cache() -> None:
+    """
+    Drops all memoized reference sets and ideal sequences (the on-disk cache is kept).
+    """
+    _compute_dependencies.cache_clear()
+    ideal_mlbs.cache_clear()
@@ -0,0 +1,202 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tracemalloc
+
+
+parser = argparse.ArgumentParser(description="Throughput benchmark of acquisition, decoding and correlation.")
+parser.add_argument("--backend", choices=["sim", "lib"], default="sim",
+                    help="simulated HAL (default) or the installed libilmsens_hal.so / a stand-in library")
+parser.add_argument("--orders", type=int, nargs="+", default=[9, 12, 15], help="MLBS orders")
+parser.add_argument("--ov", type=int, nargs="+", default=[1, 2], help="oversampling factors")
+parser.add_argument("--devices", type=int, nargs="+", default=[1, 2, 4, 8], help="device group sizes")
+parser.add_argument("--workers", type=int, nargs="+", default=None,
+                    help="worker counts of the parallel correlation, defaults to 1 .. number of CPUs")
+parser.add_argument("--batch", type=int, default=16, help="frames per decode/correlation batch")
+parser.add_argument("--min-time", type=float, default=0.2, help="minimum measuring time per case [s]")
+parser.add_argument("--import-runs", type=int, default=5, help="interpreter starts to time the package import")
+parser.add_argument("--output", default=None, help="write results as JSON to this file")
+parser.add_argument("--compare", default=None, help="JSON results of a previous run to compare against")
+args = parser.parse_args()
+
+# run from a checkout without installing the package: python tools/benchmark.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if args.backend == "sim":
+    os.environ["ILMSENS_HAL_BACKEND"] = "sim"
+    os.environ["ILMSENS_HAL_SIM_DEVICES"] = str(max(args.devices))
+
+import numpy as np
+import ilmsens_hal
+import ilmsens_hal.utils
+from ilmsens_hal.defn import meas_run
+from ilmsens_hal.parallel import ParallelCorrelator
+from ilmsens_hal.types import ilmsens_hal_ModConfig
+
+
+def measure(func, frames_per_call: int = 1, min_time: float = args.min_time) -> dict:
+    """
+    Times func until min_time has passed and traces the memory one call allocates.
+    """
+    func() # warm-up, fills caches
+    number = 0
+    start = time.perf_counter_ns()
+    deadline = start + int(min_time * 1e9)
+    while True:
+        func()
+        number += 1
+        now = time.perf_counter_ns()
+        if now >= deadline:
+            break
+    us_per_call = (now - start) / number / 1000.0
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "calls": number,
+        "us_per_call": us_per_call,
+        "frames_per_s": frames_per_call * 1e6 / us_per_call,
+        "alloc_bytes_per_frame": (peak - baseline) / frames_per_call,
+    }
+
+
+results = []
+
+def record(name: str, order: int, ov: int, devices: int, **values) -> None:
+    entry = {"name": name, "order": order, "ov": ov, "devices": devices}
+    entry.update(values)
+    results.append(entry)
+    print(f"{name:<28} M{order:<2} OV{ov} dev{devices}  {values['us_per_call']:>11.2f} us/call"
+          f"  {values['frames_per_s']:>12.1f} frames/s  {values['alloc_bytes_per_frame']:>11.0f} B/frame")
+
+
+def measure_import(runs: int = args.import_runs) -> dict:
+    """
+    Times a bare "import ilmsens_hal" in fresh interpreters (-X importtime, best of runs).
+    """
+    code = "import sys, ilmsens_hal; assert 'numpy' not in sys.modules, 'the package import loaded NumPy'"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                              capture_output=True, text=True, check=True)
+        lines = [line for line in proc.stderr.splitlines() if line.rstrip().endswith("| ilmsens_hal")]
+        us = int(lines[-1].split("|")[1])
+        best = us if best is None else min(best, us)
+    return {"calls": runs, "us_per_call": float(best), "frames_per_s": 0.0, "alloc_bytes_per_frame": 0.0}
+
+
+record("import", 0, 0, 0, **measure_import())
+
+num_devices = ilmsens_hal.initHAL()
+if num_devices < max(args.devices):
+    sys.exit(f"benchmark needs {max(args.devices)} devices, found {num_devices}")
+if args.backend == "sim":
+    ilmsens_hal.getBackend().frame_rate = 1e9 # never wait for data, measure the wrapper path only
+all_devices = list(range(1, max(args.devices) + 1))
+ilmsens_hal.openSensors(all_devices)
+
+for order in args.orders:
+    for ov in args.ov:
+        # reference spectra: cold (parse or load + FFT) and memoized
+        def cold():
+            ilmsens_hal.utils.clear_dependencies_cache()
+            ilmsens_hal.utils.read_dependencies(order, 13.312, ov)
+        record("read_dependencies.cold", order, ov, 1, **measure(cold))
+        record("read_dependencies.warm", order, ov, 1,
+               **measure(lambda: ilmsens_hal.utils.read_dependencies(order, 13.312, ov)))
+
+        for devices in args.devices:
+            dev_nums = all_devices[:devices]
+            mod_config = ilmsens_hal_ModConfig()
+            mod_config.mOrder = order
+            mod_config.mClk = 13.312
+            mod_config.mOV = ov
+            mod_config.mRx = 2
+            ilmsens_hal.setupSensors(dev_nums, mod_config)
+            ilmsens_hal.setAvg(dev_nums, 1, 0)
+            info = ilmsens_hal.getModInfo(dev_nums[0])
+            dtype = ilmsens_hal.utils.frame_dtype(info.mNumSamp, info.mConfig.mRx, devices, info.mConfig.mOV)
+            buf_size_bytes = dtype.itemsize
+
+            # acquisition wrappers
+            ilmsens_hal.measRun(dev_nums, meas_run.ILMSENS_HAL_RUN_BUF)
+            buffer = np.zeros(buf_size_bytes // 4, dtype=np.int32)
+            record("measGet.bytes", order, ov, devices,
+                   **measure(lambda: ilmsens_hal.measGet(dev_nums, buf_size_bytes=buf_size_bytes)))
+            record("measGet.buffer", order, ov, devices,
+                   **measure(lambda: ilmsens_hal.measGet(dev_nums, buffer=buffer)))
+            record("measRead.buffer", order, ov, devices,
+                   **measure(lambda: ilmsens_hal.measRead(dev_nums, buffer=buffer)))
+
+            # decoding and correlation of a batch of frames
+            batch = np.zeros(args.batch, dtype=dtype)
+            for i in range(args.batch):
+                ilmsens_hal.measGet(dev_nums, buffer=batch[i:i+1])
+            ilmsens_hal.measStop(dev_nums)
+
+            if devices == 1 and ov == 1:
+                raw = bytes(batch[:1])
+                record("parse_data", order, ov, devices,
+                       **measure(lambda: ilmsens_hal.utils.parse_data(raw, num_samples=info.mNumSamp)))
+            record("decode_frames", order, ov, devices, **measure(
+                lambda: ilmsens_hal.utils.decode_frames(batch, info, num_devices=devices),
+                frames_per_call=args.batch))
+
+            samples, _ = ilmsens_hal.utils.decode_frames(batch, info, num_devices=devices)
+            for precision in (np.float32, np.float64):
+                correlator = ilmsens_hal.utils.Correlator(info, dtype=precision)
+                out = np.empty(samples.shape, dtype=precision)
+                record(f"correlate.{np.dtype(precision).name}", order, ov, devices,
+                       **measure(lambda: correlator(samples, out=out), frames_per_call=args.batch))
+
+            # scaling of the sharded correlation with the number of worker processes
+            if devices == max(args.devices):
+                out = np.empty(samples.shape, dtype=np.float32)
+                for workers in args.workers or range(1, (os.cpu_count() or 1) + 1):
+                    with ParallelCorrelator(info, workers=workers) as correlator:
+                        record(f"parallel.workers{workers}", order, ov, devices, workers=workers,
+                               **measure(lambda: correlator(samples, out=out), frames_per_call=args.batch))
+
+ilmsens_hal.closeSensors(all_devices)
+ilmsens_hal.deinitHAL()
+
+report = {
+    "meta": {
+        "ilmsens_hal": ilmsens_hal.__version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "batch": args.batch,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    },
+    "results": results,
+}
+
+if args.output:
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+if args.compare:
+    with open(args.compare) as f:
+        previous = json.load(f)
+    key = lambda r: (r["name"], r["order"], r["ov"], r["devices"])
+    previous = {key(r): r for r in previous["results"]}
+    print(f"\nCompared to {args.compare} (time ratio new/old, > 1 is slower):")
+    for r in results:
+        old = previous.get(key(r))
+        if old is not None:
+            ratio = r["us_per_call"] / old["us_per_call"]
+            flag = "  <-- regression" if ratio > 1.1 else ""
+            print(f"{r['name']:<28} M{r['order']:<2} OV{r['ov']} dev{r['devices']}  {ratio:6.2f}{flag}")
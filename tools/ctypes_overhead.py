@@ -0,0 +1,48 @@
+import timeit
+from ctypes import CDLL
+from ctypes import byref
+from ctypes import c_byte
+from ctypes import c_size_t
+from ctypes import c_uint
+import ilmsens_hal
+
+
+# Compares the per-call cost of the current HAL wrappers (prototypes bound once at import,
+# native arguments, reusable buffers) against the former style of calling the library with
+# every argument wrapped per call. Only the Python/ctypes overhead is measured, no device
+# has to be opened.
+
+dev_nums = [1]
+buf_size_bytes = 4096
+
+legacy_hal = CDLL(ilmsens_hal.lib_name) # separate handle without argtypes/restype
+buffer = bytearray(buf_size_bytes)
+
+
+def legacy_measRdy():
+    return legacy_hal.ilmsens_hal_measRdy(
+        byref(c_uint(dev_nums[0])),
+        c_uint(len(dev_nums))
+    )
+
+def legacy_measRead():
+    buffer = (c_byte * buf_size_bytes)(*([0x0] * buf_size_bytes))
+    num_elements = legacy_hal.ilmsens_hal_measRead(
+        byref(c_uint(dev_nums[0])),
+        c_uint(len(dev_nums)),
+        byref(buffer),
+        c_size_t(buf_size_bytes)
+    )
+    return bytes(buffer), num_elements
+
+
+cases = [
+    ("measRdy", 100000, legacy_measRdy, lambda: ilmsens_hal.measRdy(dev_nums)),
+    ("measRead", 200, legacy_measRead, lambda: ilmsens_hal.measRead(dev_nums, buffer=buffer)),
+]
+
+print(f"{'call':<10} {'before [us]':>12} {'after [us]':>12} {'speed-up':>9}")
+for name, number, before, after in cases:
+    t_before = min(timeit.repeat(before, number=number, repeat=3)) / number * 1e6
+    t_after = min(timeit.repeat(after, number=number, repeat=3)) / number * 1e6
+    print(f"{name:<10} {t_before:>12.3f} {t_after:>12.3f} {t_before / t_after:>8.2f}x")
@@ -0,0 +1,40 @@
+import os
+import sys
+import subprocess
+
+
+# Checks that "import ilmsens_hal" stays light: neither NumPy nor the HAL library may be
+# loaded before they are used. Each check runs in a fresh interpreter, so modules imported
+# by this script cannot hide a regression. Exits with status 1 if a check fails.
+#
+#   $ python tools/import_check.py
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+env = dict(os.environ, PYTHONPATH=os.pathsep.join([root] + sys.path))
+
+checks = {
+    "import does not load numpy":
+        "import sys, ilmsens_hal\n"
+        "assert 'numpy' not in sys.modules, 'numpy was imported'",
+    "import does not load the HAL library":
+        "import ilmsens_hal\n"
+        "from ilmsens_hal import ilmsens_hal as hal\n"
+        "assert isinstance(hal.c_ilmsens_hal, hal._LazyBackend), 'the backend was loaded'",
+    "submodules are imported on first access":
+        "import sys, ilmsens_hal\n"
+        "assert 'ilmsens_hal.utils' not in sys.modules\n"
+        "ilmsens_hal.utils\n"
+        "assert 'ilmsens_hal.utils' in sys.modules and 'numpy' in sys.modules",
+}
+
+failed = 0
+for name, code in checks.items():
+    proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    if proc.returncode == 0:
+        print(f"ok    {name}")
+    else:
+        failed += 1
+        error = proc.stderr.strip().splitlines()
+        print(f"FAIL  {name}: {error[-1] if error else proc.returncode}")
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import tempfile
+
+
+# Loopback check of ilmsens_hal.server: publishes simulated raw frames to local clients over
+# TCP and a Unix socket in the lossless int32 and the compressed int16/float16 encodings, and
+# verifies the stream header, the sequence counters and the payload within the error bound of
+# each encoding. Exits with status 1 if a check fails.
+#
+#   $ python tools/server_check.py
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ILMSENS_HAL_BACKEND"] = "sim"
+os.environ["ILMSENS_HAL_SIM_DEVICES"] = "2"
+
+import numpy as np
+import ilmsens_hal
+from ilmsens_hal.defn import meas_run
+from ilmsens_hal.server import FrameClient
+from ilmsens_hal.server import FrameServer
+from ilmsens_hal.server import KIND_RAW
+from ilmsens_hal.utils import decode_frames
+
+
+NUM_FRAMES = 8
+
+dev_nums = [1, 2]
+ilmsens_hal.initHAL()
+ilmsens_hal.openSensors(dev_nums)
+mod_infos = [ilmsens_hal.getModInfo(dev_num) for dev_num in dev_nums]
+mod_info = mod_infos[0]
+mod_ids = [ilmsens_hal.getModId(dev_num) for dev_num in dev_nums]
+
+ilmsens_hal.measRun(dev_nums, meas_run.ILMSENS_HAL_RUN_BUF)
+buffer = bytearray(ilmsens_hal.getFrameSize(dev_nums, NUM_FRAMES))
+_, res = ilmsens_hal.measGet(dev_nums, buffer=buffer, num_frames=NUM_FRAMES, timeout_millis=1000)
+ilmsens_hal.measStop(dev_nums)
+if res <= 0:
+    sys.exit(f"measGet failed with error {res}")
+samples, seq_counter = decode_frames(buffer, mod_info, num_devices=len(dev_nums))
+peak = float(np.abs(samples).max())
+
+
+def check_encoding(encoding: str, data: np.ndarray) -> float:
+    """Raises AssertionError if data do not match the published samples, returns the maximum error."""
+    error = float(np.abs(data.astype(np.float64) - samples).max())
+    if encoding == "int32":
+        assert data.dtype == np.int32 and error == 0.0, f"int32 payload differs by {error}"
+    elif encoding == "int16":
+        # rounded to steps of peak / 32767, decoded in float32
+        bound = 0.5 * peak / np.iinfo(np.int16).max + peak * 2.0**-23
+        assert error <= bound, f"int16 error {error} exceeds {bound}"
+    else:
+        # 11 significant bits, scaled down first if the peak exceeds the float16 range
+        bound = peak * 2.0**-11
+        assert error <= bound, f"float16 error {error} exceeds {bound} (relative {error / peak:.2e})"
+    return error
+
+
+def check(address, encoding: str) -> str:
+    with FrameServer(dev_nums, address, mod_infos, mod_ids, encoding=encoding) as server:
+        with FrameClient(server.address, timeout=5.0) as client:
+            assert client.dev_nums == dev_nums, f"dev_nums {client.dev_nums}"
+            assert client.mod_ids == mod_ids, f"mod_ids {client.mod_ids}"
+            assert client.kind == KIND_RAW, f"kind {client.kind}"
+            assert client.mod_info.mNumSamp == mod_info.mNumSamp, f"mNumSamp {client.mod_info.mNumSamp}"
+            assert client.mod_info.mConfig.mRx == mod_info.mConfig.mRx, f"mRx {client.mod_info.mConfig.mRx}"
+
+            deadline = time.monotonic() + 5.0
+            while not server.num_subscribers:
+                assert time.monotonic() < deadline, "the server did not accept the client"
+                time.sleep(0.01)
+            server.publish(samples, seq_counter)
+            batch = client.recv()
+
+    assert batch is not None, "no batch received"
+    assert batch.index == 0, f"batch index {batch.index}"
+    assert batch.data.shape == samples.shape, f"shape {batch.data.shape}"
+    assert np.array_equal(batch.seq_counter, seq_counter), "sequence counters differ"
+    error = check_encoding(encoding, batch.data)
+    return f"max error {error:.3g} (relative {error / peak:.2e})"
+
+
+failed = 0
+with tempfile.TemporaryDirectory() as directory:
+    addresses = {"tcp": ("127.0.0.1", 0), "unix": os.path.join(directory, "ilmsens.sock")}
+    for transport, address in addresses.items():
+        for encoding in ("int32", "int16", "float16"):
+            name = f"{transport} {encoding}"
+            try:
+                print(f"ok    {name}: {check(address, encoding)}")
+            except AssertionError as error:
+                failed += 1
+                print(f"FAIL  {name}: {error}")
+
+ilmsens_hal.closeSensors(dev_nums)
+ilmsens_hal.deinitHAL()
+print(f"peak {peak:.0f} of {samples.shape} raw samples")
+sys.exit(1 if failed else 0)